@@ -1,43 +1,513 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
 import pandas as pd
 
+CACHE_DIR = '.cache'
+
+
+def _save_frame(directory, frame):
+    """
+    Write each column of a DataFrame to its own file and return the column specs.
+    Numeric and datetime columns are stored as raw binary so they can be memory-mapped,
+    anything else (strings, mixed objects) falls back to a pickled .npy file.
+    """
+    columns = []
+    for position, name in enumerate(frame.columns):
+        series = frame[name]
+        if series.dtype.kind in 'biufcmM':
+            values = np.ascontiguousarray(series.to_numpy())
+            file_name = f'col_{position}.bin'
+            values.tofile(os.path.join(directory, file_name))
+            columns.append({'name': name, 'file': file_name, 'kind': 'raw', 'dtype': values.dtype.str})
+        else:
+            file_name = f'col_{position}.npy'
+            np.save(os.path.join(directory, file_name), series.to_numpy(dtype=object), allow_pickle=True)
+            columns.append({'name': name, 'file': file_name, 'kind': 'object'})
+    return columns
+
+
+def _load_column(directory, column, n_rows):
+    """
+    Read one column written by _save_frame. Raw columns are memory-mapped copy-on-write,
+    so callers can modify the resulting frame without touching the file.
+    """
+    path = os.path.join(directory, column['file'])
+    if column['kind'] == 'object':
+        return np.load(path, allow_pickle=True)
+    dtype = np.dtype(column['dtype'])
+    if n_rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='c', shape=(n_rows,))
+
+
+def _load_frame(directory, columns, n_rows, index_column=None):
+    """
+    Build a frame from column files in a single constructor call, one block per column.
+    Selecting columns or calling set_index afterwards would consolidate the blocks and
+    copy the memory maps, so callers pass the wanted columns and index column here.
+    """
+    index = None
+    if index_column is not None:
+        index = pd.Index(_load_column(directory, index_column, n_rows), name=index_column['name'], copy=False)
+    return pd.DataFrame({column['name']: _load_column(directory, column, n_rows) for column in columns},
+                        index=index, copy=False)
+
+
+class ExcelCache:
+    """
+    Columnar on-disk cache in front of pd.read_excel.
+
+    Every workbook is parsed once and each of its sheets is stored as one binary file per
+    column. An entry is keyed on the workbook's mtime and SHA-256 content hash: a matching
+    mtime is trusted, a changed mtime triggers a re-hash, and only a content change forces
+    the workbook to be parsed again.
+    """
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def entry_dir(self, file_path):
+        key = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def file_hash(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _read_manifest(self, entry):
+        try:
+            with open(os.path.join(entry, 'manifest.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, entry, manifest):
+        tmp_path = os.path.join(entry, 'manifest.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(entry, 'manifest.json'))
+
+    def _is_fresh(self, file_path, entry, manifest):
+        stat = os.stat(file_path)
+        if manifest['mtime_ns'] == stat.st_mtime_ns and manifest['size'] == stat.st_size:
+            return True
+        # The file was touched: only a content change invalidates the entry
+        if manifest['sha256'] != self.file_hash(file_path):
+            return False
+        manifest['mtime_ns'] = stat.st_mtime_ns
+        manifest['size'] = stat.st_size
+        self._write_manifest(entry, manifest)
+        return True
+
+    def build(self, file_path):
+        """
+        Parse every sheet of the workbook and (re)write its cache entry.
+        """
+        entry = self.entry_dir(file_path)
+        stat = os.stat(file_path)
+        sha256 = self.file_hash(file_path)
+        sheets = pd.read_excel(file_path, sheet_name=None)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.makedirs(entry)
+        manifest = {'source': os.path.abspath(file_path), 'sha256': sha256,
+                    'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sheets': []}
+        for position, (sheet_name, frame) in enumerate(sheets.items()):
+            sheet_dir = os.path.join(entry, f'sheet_{position}')
+            os.makedirs(sheet_dir)
+            manifest['sheets'].append({'name': sheet_name, 'dir': f'sheet_{position}', 'rows': len(frame),
+                                       'columns': _save_frame(sheet_dir, frame)})
+        # The manifest is written last, so a half-written entry is never considered fresh
+        self._write_manifest(entry, manifest)
+        return manifest
+
+    def manifest(self, file_path):
+        """
+        Return a fresh manifest for the workbook, rebuilding the entry if needed.
+        """
+        entry = self.entry_dir(file_path)
+        manifest = self._read_manifest(entry)
+        if manifest is None or not self._is_fresh(file_path, entry, manifest):
+            manifest = self.build(file_path)
+        return manifest
+
+    def read_sheet(self, file_path, sheet, usecols=None, index_col=None):
+        """
+        Load one cached sheet. usecols and index_col follow pd.read_excel: index_col is a
+        position within the selected columns or a column name.
+        """
+        columns = sheet['columns']
+        if usecols is not None:
+            by_name = {column['name']: column for column in columns}
+            missing = [name for name in usecols if name not in by_name]
+            if missing:
+                raise ValueError(f'Usecols do not match columns, columns expected but not found: {missing}')
+            columns = [by_name[name] for name in usecols]
+        index_column = None
+        if index_col is not None:
+            index_column = columns[index_col] if isinstance(index_col, int) else \
+                next(column for column in columns if column['name'] == index_col)
+            columns = [column for column in columns if column is not index_column]
+        entry = self.entry_dir(file_path)
+        return _load_frame(os.path.join(entry, sheet['dir']), columns, sheet['rows'], index_column)
+
+    def read_excel(self, file_path, sheet_name=0, usecols=None, index_col=None):
+        """
+        Cached equivalent of pd.read_excel for the arguments used in this project.
+        sheet_name may be a position, a name or None (all sheets as a dict); usecols is a
+        list of column names and index_col a column position or name.
+        """
+        manifest = self.manifest(file_path)
+        sheets = manifest['sheets']
+        if sheet_name is None:
+            selected = sheets
+        elif isinstance(sheet_name, int):
+            selected = [sheets[sheet_name]]
+        else:
+            selected = [sheet for sheet in sheets if sheet['name'] == sheet_name]
+            if not selected:
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+        frames = {}
+        for sheet in selected:
+            frames[sheet['name']] = self.read_sheet(file_path, sheet, usecols, index_col)
+
+        if sheet_name is None:
+            return frames
+        return frames[selected[0]['name']]
+
+
+def read_excel_cached(file_path, sheet_name=0, usecols=None, index_col=None, cache_dir=CACHE_DIR):
+    """
+    Read an Excel sheet through the columnar cache instead of re-parsing the workbook.
+    """
+    return ExcelCache(cache_dir).read_excel(file_path, sheet_name=sheet_name, usecols=usecols,
+                                            index_col=index_col)
+
+
+# Month key of 1970-01, the epoch of numpy's datetime64[M]
+_EPOCH_MONTH_KEY = 1970 * 12
+
+
+def to_month_key(dates):
+    """
+    Convert dates to the canonical integer month key year * 12 + (month - 1).
+    Accepts month keys, datetimes, or date strings ('%m-%Y' as written by older versions
+    of data.xlsx, or anything pd.to_datetime understands). Returns an int for a scalar
+    and an int64 array otherwise.
+    """
+    scalar = np.ndim(dates) == 0
+    values = pd.Series([dates] if scalar else np.asarray(dates))
+    if values.dtype.kind in 'iu':
+        keys = values.to_numpy(dtype=np.int64)
+    else:
+        if values.dtype.kind != 'M':
+            try:
+                values = pd.to_datetime(values, format='%m-%Y')
+            except (ValueError, TypeError):
+                values = pd.to_datetime(values)
+        keys = values.to_numpy().astype('datetime64[M]').astype(np.int64) + _EPOCH_MONTH_KEY
+    return int(keys[0]) if scalar else keys
+
+
+def month_key_to_timestamp(keys):
+    """
+    Convert month keys back to first-of-month timestamps.
+    """
+    months = (np.asarray(keys, dtype=np.int64) - _EPOCH_MONTH_KEY).astype('datetime64[M]')
+    if months.ndim == 0:
+        return pd.Timestamp(months)
+    return pd.DatetimeIndex(months.astype('datetime64[ns]'))
+
+
+def month_key_to_str(keys):
+    """
+    Format month keys as '%m-%Y' strings, the layout used by the forecast sheets.
+    """
+    years, months = np.divmod(np.asarray(keys, dtype=np.int64), 12)
+    if years.ndim == 0:
+        return f'{months + 1:02d}-{years}'
+    return [f'{month + 1:02d}-{year}' for year, month in zip(years.tolist(), months.tolist())]
+
+
+def _align(frame, keys):
+    """
+    Return the non-key columns of frame reindexed onto the sorted month keys, with NaN
+    where a month is missing from the frame.
+    """
+    frame_keys = frame['Date'].to_numpy()
+    order = np.argsort(frame_keys, kind='stable')
+    positions = np.searchsorted(frame_keys[order], keys)
+    found = positions < len(frame_keys)
+    found[found] = frame_keys[order[positions[found]]] == keys[found]
+    rows = order[positions[found]]
+    columns = {}
+    for name in frame.columns.drop('Date'):
+        values = np.full(len(keys), np.nan)
+        values[found] = frame[name].to_numpy(dtype=float)[rows]
+        columns[name] = values
+    return columns
+
+
+STORE_DIR = 'data_store'
+
+
+class MergedDataStore:
+    """
+    Append-only columnar store of the merged dataset.
+
+    Every column of the 'data' sheet is kept as a raw binary file and the (T x N) excess
+    return matrix as one row-major file, so new months are appended in O(new rows) and
+    reads are memory-mapped. The manifest's row count is written last and is the source
+    of truth: a tail left by an interrupted append is truncated by the next one.
+    """
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.store_dir, 'manifest.json'))
+
+    def manifest(self):
+        with open(os.path.join(self.store_dir, 'manifest.json')) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        tmp_path = os.path.join(self.store_dir, 'manifest.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.store_dir, 'manifest.json'))
+
+    def write(self, merged_data, excess_returns, asset_names, derived_columns):
+        """
+        Replace the store with the full merged dataset.
+        """
+        non_numeric = [name for name in merged_data.columns if merged_data[name].dtype.kind not in 'biuf']
+        if non_numeric:
+            raise ValueError(f'Only numeric columns can be stored, got {non_numeric}')
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        os.makedirs(self.store_dir)
+        excess_returns = np.ascontiguousarray(excess_returns, dtype=np.float64)
+        excess_returns.tofile(os.path.join(self.store_dir, 'excess_returns.bin'))
+        self._write_manifest({'rows': len(merged_data), 'asset_names': list(asset_names),
+                              'derived_columns': list(derived_columns),
+                              'columns': _save_frame(self.store_dir, merged_data)})
+
+    def load(self):
+        """
+        Return the merged dataset and the (T x N) excess return matrix, memory-mapped.
+        """
+        manifest = self.manifest()
+        rows, n_assets = manifest['rows'], len(manifest['asset_names'])
+        frame = _load_frame(self.store_dir, manifest['columns'], rows)
+        if rows == 0 or n_assets == 0:
+            return frame, np.empty((rows, n_assets))
+        excess_returns = np.memmap(os.path.join(self.store_dir, 'excess_returns.bin'), dtype=np.float64,
+                                   mode='c', shape=(rows, n_assets))
+        return frame, excess_returns
+
+    def tail(self, n=1):
+        """
+        Return the last n rows of the merged dataset without reading the rest.
+        """
+        manifest = self.manifest()
+        rows = manifest['rows']
+        start = max(rows - n, 0)
+        return pd.DataFrame({column['name']: _load_column(self.store_dir, column, rows)[start:]
+                             for column in manifest['columns']}, index=range(start, rows))
+
+    def append(self, new_rows, excess_returns):
+        """
+        Append rows laid out like the stored columns, plus their excess returns.
+        """
+        manifest = self.manifest()
+        rows = manifest['rows']
+        excess_returns = np.ascontiguousarray(excess_returns, dtype=np.float64)
+        targets = [(column['file'], np.asarray(new_rows[column['name']], dtype=column['dtype']))
+                   for column in manifest['columns']]
+        targets.append(('excess_returns.bin', excess_returns))
+        for file_name, values in targets:
+            row_bytes = values.itemsize * (values.shape[1] if values.ndim == 2 else 1)
+            with open(os.path.join(self.store_dir, file_name), 'r+b') as f:
+                f.seek(rows * row_bytes)
+                f.truncate()
+                values.tofile(f)
+        manifest['rows'] = rows + len(new_rows)
+        self._write_manifest(manifest)
+
+
+def read_merged_data(file_path, store_dir=None):
+    """
+    Read the merged 'data' sheet of file_path, or the append-only store when one exists
+    (by default the STORE_DIR next to file_path). The store is memory-mapped and includes
+    months appended since the workbook was written; its Date column holds month keys
+    rather than '%m-%Y' strings, so callers convert dates with to_month_key.
+    """
+    if store_dir is None:
+        store_dir = os.path.join(os.path.dirname(file_path), STORE_DIR)
+    store = MergedDataStore(store_dir)
+    if store.exists():
+        return store.load()[0]
+    return read_excel_cached(file_path, sheet_name='data')
+
+
+# Legacy column names written for the two assets of the original study
+EXCESS_RETURN_ALIASES = {'SP500': 'Stocks', 'LBUSTRUU': 'Bonds'}
+
+
+def _asset_name(column):
+    """
+    Derive an asset name from a price column header, e.g. 'SP500 index price' -> 'SP500'.
+    """
+    name = str(column).strip()
+    if name.lower().endswith(' index price'):
+        name = name[:-len(' index price')]
+    return name
+
 
 class DataMerger:
-    def __init__(self, predictor_file, risk_free_file, sp500_file, bond_index_file):
+    """
+    Merge predictors, the risk-free rate and any number of price series on the month key.
+
+    Price sources are either the two legacy files (sp500_file, bond_index_file) or
+    price_sources: a directory of .xlsx files or a list of files. Every source has a
+    'Dates' (or 'Date') column followed by one or more price columns, one per asset.
+    """
+    def __init__(self, predictor_file, risk_free_file, sp500_file=None, bond_index_file=None,
+                 price_sources=None, cache_dir=CACHE_DIR):
         self.predictor_file = predictor_file
         self.risk_free_file = risk_free_file
         self.sp500_file = sp500_file
         self.bond_index_file = bond_index_file
+        self.price_files = self._resolve_price_files(price_sources)
+        self.cache = ExcelCache(cache_dir)
+        self.asset_names = []
+        self.prices = None
+        self.excess_returns = None
+        self.return_columns = []
+
+    def _resolve_price_files(self, price_sources):
+        if price_sources is None:
+            return [path for path in (self.sp500_file, self.bond_index_file) if path is not None]
+        if isinstance(price_sources, (str, os.PathLike)) and os.path.isdir(price_sources):
+            return sorted(os.path.join(price_sources, name) for name in os.listdir(price_sources)
+                          if name.endswith('.xlsx') and not name.startswith('~$'))
+        return list(price_sources)
 
     def load_data(self):
-        self.predictor_data = pd.read_excel(self.predictor_file,
-                                            usecols=['Dates', 'E12', 'b/m', 'tbl', 'ntis', 'infl'])
-        self.risk_free_data = pd.read_excel(self.risk_free_file)
-        self.sp500_data = pd.read_excel(self.sp500_file)
-        self.bond_index_data = pd.read_excel(self.bond_index_file)
+        self.predictor_data = self.cache.read_excel(self.predictor_file,
+                                                    usecols=['Dates', 'E12', 'b/m', 'tbl', 'ntis', 'infl'])
+        self.risk_free_data = self.cache.read_excel(self.risk_free_file)
+        self.price_data = [self.cache.read_excel(price_file) for price_file in self.price_files]
 
     def normalize_dates(self):
-        self.predictor_data['Dates'] = pd.to_datetime(self.predictor_data['Dates'], format='%Y%m').dt.strftime('%m-%Y')
-        self.risk_free_data['Date'] = pd.to_datetime(self.risk_free_data['Date'], unit='d', origin='1899-12-30').dt.strftime('%m-%Y')
-        self.sp500_data['Dates'] = pd.to_datetime(self.sp500_data['Dates']).dt.strftime('%m-%Y')
-        self.bond_index_data['Dates'] = pd.to_datetime(self.bond_index_data['Dates']).dt.strftime('%m-%Y')
+        """
+        Replace every source's date column with the integer month key.
+        """
+        predictor_dates = self.predictor_data['Dates'].to_numpy(dtype=np.int64)
+        self.predictor_data['Dates'] = (predictor_dates // 100) * 12 + predictor_dates % 100 - 1
+        self.risk_free_data['Date'] = to_month_key(pd.to_datetime(self.risk_free_data['Date'], unit='D', origin='1899-12-30'))
+        for frame in self.price_data:
+            date_column = 'Dates' if 'Dates' in frame.columns else 'Date'
+            frame[date_column] = to_month_key(pd.to_datetime(frame[date_column]))
 
     def rename_columns(self):
         self.predictor_data.rename(columns={'Dates': 'Date'}, inplace=True)
         self.risk_free_data.rename(columns={'Date': 'Date', 'Risk free rate of return ': 'Risk_Free_Rate'}, inplace=True)
-        self.sp500_data.rename(columns={'Dates': 'Date', 'SP500 index price': 'SP500'}, inplace=True)
-        self.bond_index_data.rename(columns={'Dates': 'Date', 'LBUSTRUU Index price': 'LBUSTRUU'}, inplace=True)
+        for frame in self.price_data:
+            frame.rename(columns={column: 'Date' if column in ('Dates', 'Date') else _asset_name(column)
+                                  for column in frame.columns}, inplace=True)
+
+        self.asset_names = [name for frame in self.price_data for name in frame.columns.drop('Date')]
+        if len(set(self.asset_names)) != len(self.asset_names):
+            raise ValueError(f'Duplicate asset names across price sources: {self.asset_names}')
 
     def merge_data(self):
-        merged_data = pd.merge(self.predictor_data, self.sp500_data, on='Date', how='inner')
-        merged_data = pd.merge(merged_data, self.risk_free_data, on='Date', how = 'left')
-        merged_data = pd.merge(merged_data, self.bond_index_data, on='Date', how='inner')              
-        return merged_data
+        """
+        Align all sources on the month key in one sorted join: predictors and every price
+        source are inner-joined, the risk-free rate is left-joined onto the common months.
+        Columns keep the original sheet layout: predictors, the first price source,
+        Risk_Free_Rate, then the other price sources. The aligned prices are also kept as
+        a dense (T x N) array in self.prices.
+        """
+        keys = self.predictor_data['Date'].to_numpy()
+        for frame in self.price_data:
+            keys = np.intersect1d(keys, frame['Date'].to_numpy())
+
+        merged_data = {'Date': keys}
+        for frame in [self.predictor_data] + self.price_data[:1] + [self.risk_free_data] + self.price_data[1:]:
+            merged_data.update(_align(frame, keys))
+        self.prices = np.column_stack([merged_data[name] for name in self.asset_names]) if self.asset_names \
+            else np.empty((len(keys), 0))
+        return pd.DataFrame(merged_data)
 
     def calculate_excess_returns(self, merged_data):
-        merged_data['SP500_Return'] = merged_data['SP500'].pct_change() 
-        merged_data['LBUSTRUU_Return'] = merged_data['LBUSTRUU'].pct_change() 
-        merged_data['Excess_Return_Stocks'] = merged_data['SP500_Return'] - merged_data['Risk_Free_Rate']
-        merged_data['Excess_Return_Bonds'] = merged_data['LBUSTRUU_Return'] - merged_data['Risk_Free_Rate']
+        """
+        Compute simple excess returns of all assets as one (T x N) array in
+        self.excess_returns (first row NaN, like pct_change). Only the assets in
+        EXCESS_RETURN_ALIASES also get return columns in merged_data.
+        """
+        returns = np.full_like(self.prices, np.nan)
+        returns[1:] = self.prices[1:] / self.prices[:-1] - 1
+        self.excess_returns = returns - merged_data['Risk_Free_Rate'].to_numpy(dtype=float)[:, None]
+
+        self.return_columns = [f'{name}_Return' for name in self.asset_names if name in EXCESS_RETURN_ALIASES] + \
+                              [f'Excess_Return_{EXCESS_RETURN_ALIASES[name]}' for name in self.asset_names
+                               if name in EXCESS_RETURN_ALIASES]
+        for position, name in enumerate(self.asset_names):
+            if name in EXCESS_RETURN_ALIASES:
+                merged_data[f'{name}_Return'] = returns[:, position]
+        for position, name in enumerate(self.asset_names):
+            if name in EXCESS_RETURN_ALIASES:
+                merged_data[f'Excess_Return_{EXCESS_RETURN_ALIASES[name]}'] = self.excess_returns[:, position]
+        return merged_data
+
+    def save(self, merged_data, store_dir=STORE_DIR):
+        """
+        Persist the merged dataset and excess return matrix to the append-only store.
+        """
+        MergedDataStore(store_dir).write(merged_data, self.excess_returns, self.asset_names, self.return_columns)
+
+    def append(self, new_data, store_dir=STORE_DIR):
+        """
+        Validate new monthly observations and append them to the persisted store.
+
+        new_data holds a 'Date' column plus the stored predictor, price and Risk_Free_Rate
+        columns. Returns are recomputed only from the stored boundary row, so the cost
+        depends on the number of new rows, not on the length of the history.
+        """
+        store = MergedDataStore(store_dir)
+        manifest = store.manifest()
+        boundary = store.tail(1)
+        input_columns = [column['name'] for column in manifest['columns']
+                         if column['name'] not in manifest['derived_columns']]
+
+        missing = set(input_columns) - set(new_data.columns)
+        unexpected = set(new_data.columns) - set(input_columns)
+        if missing or unexpected:
+            raise ValueError(f'New data columns do not match the store: missing {sorted(missing)}, '
+                             f'unexpected {sorted(unexpected)}')
+        if len(new_data) == 0:
+            return boundary.iloc[:0]
+
+        new_rows = new_data[input_columns].copy()
+        new_rows['Date'] = to_month_key(new_rows['Date'])
+        keys = np.concatenate([boundary['Date'].to_numpy(), new_rows['Date'].to_numpy()])
+        if np.any(np.diff(keys) != 1):
+            raise ValueError(f'New months must directly follow the last stored month '
+                             f'{month_key_to_str(keys[0])} without gaps or duplicates')
+
+        # Prepend the boundary row, if any, so pct_change of the first new month uses the stored price
+        merged_data = pd.concat([boundary[input_columns], new_rows], ignore_index=True)
+        self.asset_names = manifest['asset_names']
+        self.prices = merged_data[self.asset_names].to_numpy(dtype=float)
+        merged_data = self.calculate_excess_returns(merged_data).iloc[len(boundary):]
+        store.append(merged_data, self.excess_returns[len(boundary):])
         return merged_data
 
 def g0_demo():
@@ -60,8 +530,10 @@ def g0_demo():
     print('-' * 30)
     print(f'data.xlsx "data" sheet preview: \n{final_data.head()}')
     
-    # Save the merged data to a new Excel file
-    final_data.to_excel('data.xlsx', index=False, sheet_name='data')
+    # Save the merged data to a new Excel file, with dates written as '%m-%Y' strings
+    final_data.assign(Date=month_key_to_str(final_data['Date'])).to_excel('data.xlsx', index=False, sheet_name='data')
+    # Persist the append-only store used for monthly refreshes (DataMerger.append)
+    data_merger.save(final_data)
 
 
 if __name__ == '__main__':
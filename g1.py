@@ -2,6 +2,60 @@ import pandas as pd
 import numpy as np
 from scipy.stats import skew, kurtosis
 from openpyxl import load_workbook
+from g0 import read_merged_data
+
+STATISTIC_NAMES = ['Annualized Mean', 'Annualized Volatility', 'Sharpe Ratio', 'Skewness', 'Kurtosis']
+
+
+class BatchedAssetStatistics:
+    """
+    Summary statistics for a (T x N) matrix of monthly excess returns.
+
+    All moments come from one pass over the power sums of each column, NaNs are ignored
+    per column. Skewness and kurtosis match scipy's biased estimators (kurtosis is
+    Pearson's, not excess), the volatility uses ddof=1 like pandas.
+    """
+    def __init__(self, returns, names=None):
+        if isinstance(returns, pd.DataFrame):
+            names = list(returns.columns) if names is None else names
+            returns = returns.to_numpy(dtype=float)
+        self.returns = np.asarray(returns, dtype=float).reshape(len(returns), -1)
+        self.names = list(range(self.returns.shape[1])) if names is None else list(names)
+
+    def moments(self):
+        """
+        Return the count, mean, ddof=1 variance, skewness and kurtosis of every column.
+        """
+        valid = ~np.isnan(self.returns)
+        n = valid.sum(axis=0)
+        # Shift each column by its first observation to keep the power sums well conditioned
+        first = np.argmax(valid, axis=0)
+        shift = np.where(n > 0, self.returns[first, np.arange(self.returns.shape[1])], 0.0)
+        x = np.where(valid, self.returns - shift, 0.0)
+        x2 = x * x
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = x.sum(axis=0) / n
+            raw2 = x2.sum(axis=0) / n
+            raw3 = (x2 * x).sum(axis=0) / n
+            raw4 = (x2 * x2).sum(axis=0) / n
+            m2 = raw2 - mean ** 2
+            m3 = raw3 - 3 * mean * raw2 + 2 * mean ** 3
+            m4 = raw4 - 4 * mean * raw3 + 6 * mean ** 2 * raw2 - 3 * mean ** 4
+            return {'count': n, 'mean': mean + shift, 'variance': m2 * n / (n - 1),
+                    'skewness': m3 / m2 ** 1.5, 'kurtosis': m4 / m2 ** 2}
+
+    def summary_statistics(self, risk_free_rate=None):
+        """
+        Annualized mean, volatility and Sharpe ratio plus skewness and kurtosis, one column per asset.
+        """
+        moments = self.moments()
+        annualized_mean = moments['mean'] * 12
+        annualized_volatility = np.sqrt(moments['variance'] * 12)
+        return pd.DataFrame([annualized_mean, annualized_volatility, annualized_mean / annualized_volatility,
+                             moments['skewness'], moments['kurtosis']],
+                            index=STATISTIC_NAMES, columns=self.names)
+
 
 class AssetStatistics:
     def __init__(self, data):
@@ -23,13 +77,8 @@ class AssetStatistics:
         return kurtosis(self.data['Excess_Return'], fisher=False)
 
     def summary_statistics(self, risk_free_rate):
-        return {
-            'Annualized Mean': self.annualized_mean(),
-            'Annualized Volatility': self.annualized_volatility(),
-            'Sharpe Ratio': self.annualized_sharpe_ratio(risk_free_rate),
-            'Skewness': self.skewness(),
-            'Kurtosis': self.kurtosis()
-        }
+        stats = BatchedAssetStatistics(self.data[['Excess_Return']]).summary_statistics(risk_free_rate)
+        return stats['Excess_Return'].to_dict()
 
 def save_to_excel(data, file_path, sheet_name):
     with pd.ExcelWriter(file_path, engine='openpyxl', mode='a') as writer:
@@ -37,21 +86,13 @@ def save_to_excel(data, file_path, sheet_name):
 
 def g1_demo():
     file_path = 'data.xlsx'
-    data = pd.read_excel(file_path)
+    data = read_merged_data(file_path)
 
     risk_free_rate = data['Risk_Free_Rate'].mean() * 12
 
-    sp500_data = data[['Date', 'Excess_Return_Stocks']].rename(columns={'Excess_Return_Stocks': 'Excess_Return'})
-    bonds_data = data[['Date', 'Excess_Return_Bonds']].rename(columns={'Excess_Return_Bonds': 'Excess_Return'})
-       
-    sp500_stats = AssetStatistics(sp500_data)
-    bonds_stats = AssetStatistics(bonds_data)
-
-    sp500_stats_dict = sp500_stats.summary_statistics(risk_free_rate)
-    bonds_stats_dict = bonds_stats.summary_statistics(risk_free_rate)
-
-    # Formatting the results into a DataFrame
-    stats_df = pd.DataFrame({'S&P 500': sp500_stats_dict, 'Bonds': bonds_stats_dict})
+    # One pass over both return columns; NaNs are dropped per column
+    returns = data[['Excess_Return_Stocks', 'Excess_Return_Bonds']]
+    stats_df = BatchedAssetStatistics(returns, names=['S&P 500', 'Bonds']).summary_statistics(risk_free_rate)
     print(stats_df)
 
     # Saving the DataFrame to a new sheet in 'data.xlsx'
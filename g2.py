@@ -1,26 +1,117 @@
+import numpy as np
 import pandas as pd
+from scipy.signal import lfilter
+from g0 import read_merged_data, to_month_key, month_key_to_str
+
+
+def _cumulative_sums(values):
+    """
+    Prefix sums and counts of the non-NaN values of a (T x N) array, with a leading
+    zero row so that rows [a, b) sum to csum[b] - csum[a]. Each column is shifted by
+    its mean first to limit cancellation in long windows; the shift is returned.
+    """
+    valid = ~np.isnan(values)
+    shift = np.zeros(values.shape[1])
+    has_data = valid.any(axis=0)
+    shift[has_data] = np.nanmean(values[:, has_data], axis=0)
+    csum = np.zeros((len(values) + 1, values.shape[1]))
+    count = np.zeros((len(values) + 1, values.shape[1]))
+    np.cumsum(np.where(valid, values - shift, 0.0), axis=0, out=csum[1:])
+    np.cumsum(valid, axis=0, out=count[1:])
+    return csum, count, shift
+
+
+def expanding_mean_forecasts(values, start):
+    """
+    Recursive mean forecasts: the forecast for row t >= start is the mean of all rows
+    before t, per column (NaNs skipped). values is (T,) or (T x N); returns (T - start) x N.
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    csum, count, shift = _cumulative_sums(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return csum[start:-1] / count[start:-1] + shift
+
+
+def _window_means(csum, count, shift, start, window_sizes):
+    """
+    Means over the last w rows before each t >= start for every w in window_sizes,
+    as a (windows x (T - start) x N) array taken from shared prefix sums.
+    """
+    ends = np.arange(start, len(csum) - 1)
+    begins = np.maximum(ends[None, :] - np.asarray(window_sizes)[:, None], 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (csum[ends] - csum[begins]) / (count[ends] - count[begins]) + shift
+
+
+def rolling_mean_forecasts(values, start, window_size):
+    """
+    Rolling mean forecasts: the forecast for row t >= start is the mean of the last
+    window_size rows before t (all earlier rows while fewer are available).
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    csum, count, shift = _cumulative_sums(values)
+    return _window_means(csum, count, shift, start, [window_size])[0]
+
+
+def ewm_mean_forecasts(values, start, alpha):
+    """
+    Exponentially weighted mean forecasts: the forecast for row t >= start weights row
+    t - 1 - s by (1 - alpha) ** s, like pandas' ewm(alpha=alpha, adjust=True). NaN rows
+    get no weight but still decay the older ones.
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    valid = ~np.isnan(values)
+    decay = [1.0, -(1.0 - alpha)]
+    weighted_sum = lfilter([1.0], decay, np.where(valid, values, 0.0), axis=0)
+    weight = lfilter([1.0], decay, valid.astype(float), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = weighted_sum / weight
+    # The forecast for row t uses rows up to t - 1
+    forecasts = np.vstack([np.full((1, values.shape[1]), np.nan), means[:-1]])
+    return forecasts[start:]
+
+
+def mean_forecast_grid(values, start, window_sizes=(), expanding=True, ewm_alphas=()):
+    """
+    Mean forecasts for many estimation schemes at once: the expanding window, every
+    rolling window in window_sizes and every EWMA decay in ewm_alphas. All windowed
+    means share one prefix-sum precomputation. Returns a (schemes x (T - start) x N)
+    array and the scheme labels ('Expanding', 'Rolling_<w>', 'EWM_<alpha>').
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    csum, count, shift = _cumulative_sums(values)
+    window_sizes = list(window_sizes)
+    if expanding:
+        # An expanding window is a rolling window longer than the whole sample
+        window_sizes = [len(values)] + window_sizes
+    blocks = [_window_means(csum, count, shift, start, window_sizes)]
+    blocks += [ewm_mean_forecasts(values, start, alpha)[None] for alpha in ewm_alphas]
+    labels = (['Expanding'] if expanding else []) + [f'Rolling_{w}' for w in window_sizes[int(expanding):]] + \
+             [f'EWM_{alpha}' for alpha in ewm_alphas]
+    return np.concatenate(blocks, axis=0), labels
+
 
 class RecursiveEstimator:
     def __init__(self, data, in_sample_end, out_sample_start, column_name):
         self.data = data.dropna(subset=[column_name]).copy()
-        self.in_sample_end = pd.to_datetime(in_sample_end)
-        self.out_sample_start = pd.to_datetime(out_sample_start)
+        self.in_sample_end = to_month_key(in_sample_end)
+        self.out_sample_start = to_month_key(out_sample_start)
         self.column_name = column_name
 
     def generate_forecasts(self):
-        self.data['Date'] = pd.to_datetime(self.data['Date']).dt.to_period('M').dt.to_timestamp()
-        forecasts_list = []
-        
-        for current_date in self.data[self.data['Date'] >= self.out_sample_start]['Date']:
-            current_in_sample = self.data[(self.data['Date'] < current_date)]
-            mean_forecast = current_in_sample[self.column_name].mean() 
-            forecasts_list.append({'Date': current_date.strftime('%m-%Y'), 'Mean_Forecast': mean_forecast})
-
-        return pd.DataFrame(forecasts_list)
+        """
+        Forecast each out-of-sample month with the mean of all earlier months.
+        """
+        self.data['Date'] = to_month_key(self.data['Date'])
+        self.data = self.data.sort_values('Date', kind='stable')
+        dates = self.data['Date'].to_numpy()
+        start = np.searchsorted(dates, self.out_sample_start)
+        forecasts = expanding_mean_forecasts(self.data[self.column_name].to_numpy(dtype=float), start)
+        return pd.DataFrame({'Date': month_key_to_str(dates[start:]), 'Mean_Forecast': forecasts[:, 0]})
 
 def g2_demo():
     file_path = 'data.xlsx'
-    data = pd.read_excel(file_path)
+    data = read_merged_data(file_path)
 
     in_sample_end = '1999-12-31'
     out_sample_start = '2000-01-01'
@@ -47,29 +138,63 @@ def g2_demo():
 class RollingWindowEstimator:
     def __init__(self, data, in_sample_end, out_sample_start, column_name, window_size):
         self.data = data.dropna(subset=[column_name]).copy()
-        self.in_sample_end = pd.to_datetime(in_sample_end)
-        self.out_sample_start = pd.to_datetime(out_sample_start)
+        self.in_sample_end = to_month_key(in_sample_end)
+        self.out_sample_start = to_month_key(out_sample_start)
         self.column_name = column_name
         self.window_size = window_size
 
     def generate_forecasts(self):
-        self.data['Date'] = pd.to_datetime(self.data['Date']).dt.to_period('M').dt.to_timestamp()
-        forecasts_list = []
+        """
+        Forecast each out-of-sample month with the mean of the previous window_size months.
+        """
+        self.data['Date'] = to_month_key(self.data['Date'])
+        self.data = self.data.sort_values('Date', kind='stable')
+        dates = self.data['Date'].to_numpy()
+        start = np.searchsorted(dates, self.out_sample_start)
+        forecasts = rolling_mean_forecasts(self.data[self.column_name].to_numpy(dtype=float), start, self.window_size)
+        return pd.DataFrame({'Date': month_key_to_str(dates[start:]), 'Mean_Forecast': forecasts[:, 0]})
+
+
+class MultiWindowEstimator:
+    """
+    Benchmark mean forecasts for several estimation windows at once, for one or more
+    return columns.
+    """
+    def __init__(self, data, out_sample_start, column_names, window_sizes, expanding=True, ewm_alphas=()):
+        self.data = data.copy()
+        self.out_sample_start = to_month_key(out_sample_start)
+        self.column_names = [column_names] if isinstance(column_names, str) else list(column_names)
+        self.window_sizes = list(window_sizes)
+        self.expanding = expanding
+        self.ewm_alphas = list(ewm_alphas)
 
-        for current_date in self.data[self.data['Date'] >= self.out_sample_start]['Date']:
-            current_in_sample = self.data[(self.data['Date'] < current_date)]
-            if len(current_in_sample) > self.window_size:
-                current_in_sample = current_in_sample.iloc[-self.window_size:]
-            mean_forecast = current_in_sample[self.column_name].mean()
-            forecasts_list.append({'Date': current_date.strftime('%m-%Y'), 'Mean_Forecast': mean_forecast})
-
-        return pd.DataFrame(forecasts_list)
+    def generate_forecasts(self):
+        """
+        Return the (schemes x months x columns) forecast array, the scheme labels and the
+        '%m-%Y' dates of the out-of-sample months.
+        """
+        self.data['Date'] = to_month_key(self.data['Date'])
+        self.data = self.data.sort_values('Date', kind='stable')
+        dates = self.data['Date'].to_numpy()
+        start = np.searchsorted(dates, self.out_sample_start)
+        forecasts, labels = mean_forecast_grid(self.data[self.column_names].to_numpy(dtype=float), start,
+                                               self.window_sizes, self.expanding, self.ewm_alphas)
+        return forecasts, labels, month_key_to_str(dates[start:])
+
+    def to_frame(self, forecasts, labels, dates, column_name):
+        """
+        Lay out the forecasts of one column as a frame with one column per scheme.
+        """
+        position = self.column_names.index(column_name)
+        frame = pd.DataFrame(forecasts[:, :, position].T, columns=labels)
+        frame.insert(0, 'Date', dates)
+        return frame
 
 
 def g6_2_demo():
     print('Task 2 using rolling window estimator:')
     file_path = 'data.xlsx'
-    data = pd.read_excel(file_path)
+    data = read_merged_data(file_path)
     window_size = 12
 
     in_sample_end = '1999-12-31'
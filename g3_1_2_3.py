@@ -1,25 +1,300 @@
 import os
+from itertools import combinations
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split, cross_val_score
 import numpy as np
 import pickle
 import statsmodels.api as sm
+from scipy.signal import lfilter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from g0 import read_merged_data, to_month_key, month_key_to_str
+
+class RecursiveLeastSquares:
+    """
+    Least-squares coefficients kept current with rank-one (Sherman-Morrison) updates of
+    the inverse Gram matrix: add() brings in a new observation and remove() drops an old
+    one, so an expanding or rolling window never has to be refitted from scratch.
+    """
+    def __init__(self, X, y):
+        X = np.asarray(X, dtype=float)
+        self.P = np.linalg.inv(X.T @ X)
+        self.beta = self.P @ (X.T @ np.asarray(y, dtype=float))
+
+    def add(self, x, y):
+        Px = self.P @ x
+        gain = Px / (1.0 + x @ Px)
+        self.beta = self.beta + gain * (y - x @ self.beta)
+        self.P = self.P - np.outer(gain, Px)
+
+    def remove(self, x, y):
+        Px = self.P @ x
+        gain = Px / (1.0 - x @ Px)
+        self.beta = self.beta - gain * (y - x @ self.beta)
+        self.P = self.P + np.outer(gain, Px)
+
+    def predict(self, x):
+        return x @ self.beta
+
+
+def univariate_forecast_kernel(X, Y, ends, window_size=None, max_chunk_elements=50_000_000):
+    """
+    One-step-ahead forecasts of every univariate regression y ~ a + b * x for all
+    predictors (columns of X, T x P) and targets (columns of Y, T x N) at once.
+
+    The forecast for row e is fitted on rows [0, e) (or the last window_size of them) and
+    evaluated at X[e]. All coefficients come from prefix sums of x, y, x^2 and x*y, so the
+    whole (P x N x len(ends)) forecast array costs one pass over the data. Rows must be
+    complete (no NaNs), as for the OLS fits. Targets are processed in chunks so the
+    (T x P x chunk) cross-product sums stay below max_chunk_elements.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    ends = np.asarray(ends)
+    begins = np.zeros_like(ends) if window_size is None else np.maximum(ends - window_size, 0)
+    n = (ends - begins)[None, :]
+
+    # Forecasts are invariant to shifting x or y, so centre them for numerical stability
+    y_shift = Y.mean(axis=0)
+    X = X - X.mean(axis=0)
+    Y = Y - y_shift
+
+    def prefix(values):
+        out = np.zeros((len(values) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=out[1:])
+        return out
+
+    Sx, Sxx = prefix(X), prefix(X * X)
+    sum_x = (Sx[ends] - Sx[begins]).T
+    mean_x = sum_x / n
+    ssx = (Sxx[ends] - Sxx[begins]).T - sum_x * mean_x
+    x_new = X[ends].T
+
+    forecasts = np.empty((X.shape[1], Y.shape[1], len(ends)))
+    chunk = max(1, int(max_chunk_elements // max(1, len(X) * X.shape[1])))
+    for first in range(0, Y.shape[1], chunk):
+        Yc = Y[:, first:first + chunk]
+        Sy, Sxy = prefix(Yc), prefix(X[:, :, None] * Yc[:, None, :])
+        mean_y = ((Sy[ends] - Sy[begins]).T / n)[None, :, :]
+        sxy = np.moveaxis(Sxy[ends] - Sxy[begins], 0, -1) - sum_x[:, None, :] * mean_y
+        slope = sxy / ssx[:, None, :]
+        forecasts[:, first:first + chunk] = mean_y + slope * (x_new - mean_x)[:, None, :] + \
+            y_shift[first:first + chunk, None]
+    return forecasts
+
+
+def subset_regression_forecasts(X, Y, ends, window_size=None, subset_sizes=None):
+    """
+    One-step-ahead forecasts of every multivariate regression y ~ a + X[:, S] * b for all
+    predictor subsets S of the given sizes (default 1..K, K being the kitchen-sink model).
+
+    Prefix sums of the Gram matrix [1, X]'[1, X] and of [1, X]'Y are the only state: each
+    month's normal equations are submatrices of the windowed sums, and all subsets of one
+    size are solved for all months in a single batched np.linalg.solve. Returns a
+    (subsets x targets x months) array and the list of subsets as tuples of column positions.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+    ends = np.asarray(ends)
+    begins = np.zeros_like(ends) if window_size is None else np.maximum(ends - window_size, 0)
+    n_predictors = X.shape[1]
+    subset_sizes = range(1, n_predictors + 1) if subset_sizes is None else subset_sizes
+
+    # Centre the data: with an intercept in every model the forecasts are unchanged
+    y_shift = Y.mean(axis=0)
+    Z = np.column_stack([np.ones(len(X)), X - X.mean(axis=0)])
+    Y = Y - y_shift
+    gram = np.zeros((len(Z) + 1, Z.shape[1], Z.shape[1]))
+    cross = np.zeros((len(Z) + 1, Z.shape[1], Y.shape[1]))
+    np.cumsum(Z[:, :, None] * Z[:, None, :], axis=0, out=gram[1:])
+    np.cumsum(Z[:, :, None] * Y[:, None, :], axis=0, out=cross[1:])
+    window_gram = gram[ends] - gram[begins]
+    window_cross = cross[ends] - cross[begins]
+    z_new = Z[ends]
+
+    forecasts, subsets = [], []
+    for size in subset_sizes:
+        size_subsets = list(combinations(range(n_predictors), size))
+        # Column 0 of Z is the intercept, predictors start at column 1
+        index = np.array([(0,) + tuple(p + 1 for p in subset) for subset in size_subsets])
+        A = window_gram[:, index[:, :, None], index[:, None, :]]
+        B = window_cross[:, index]
+        coefficients = np.linalg.solve(A, B)
+        forecasts.append(np.einsum('msk,mskn->snm', z_new[:, index], coefficients))
+        subsets += size_subsets
+    return np.concatenate(forecasts, axis=0) + y_shift[None, :, None], subsets
+
+
+# Combination schemes beyond the simple mean and their column suffixes
+COMBINATION_SCHEMES = {'dmspe': 'DMSPE', 'trimmed': 'Trimmed', 'median': 'Median'}
+
+
+def combination_forecasts(forecasts, actuals, theta=1.0, holdout=12, trim=1):
+    """
+    Combine a (months x models x assets) forecast array into DMSPE, trimmed-mean and
+    median combination forecasts, each (months x assets).
+
+    DMSPE weights model i in month t by the inverse of its discounted squared error sum
+    phi_i,t = sum_{s<t} theta^(t-1-s) e_i,s^2. phi is carried as state with one filter
+    pass over time, so all months, models and assets cost O(T * M * N). The first
+    holdout months use equal weights. The trimmed mean drops the trim highest and lowest
+    forecasts before averaging.
+    """
+    forecasts = np.asarray(forecasts, dtype=float)
+    actuals = np.asarray(actuals, dtype=float).reshape(forecasts.shape[0], 1, -1)
+    squared_errors = np.nan_to_num((actuals - forecasts) ** 2)
+    # phi[t] includes errors up to month t; month t + 1 is weighted with it
+    phi = lfilter([1.0], [1.0, -theta], squared_errors, axis=0)
+    inverse = np.empty_like(phi)
+    inverse[0] = 1.0
+    with np.errstate(divide='ignore'):
+        inverse[1:] = 1.0 / phi[:-1]
+    inverse[:holdout] = 1.0
+    dmspe = (inverse * forecasts).sum(axis=1) / inverse.sum(axis=1)
+
+    ordered = np.sort(forecasts, axis=1)
+    trimmed = ordered[:, trim:forecasts.shape[1] - trim].mean(axis=1) if forecasts.shape[1] > 2 * trim \
+        else ordered.mean(axis=1)
+    return {'DMSPE': dmspe, 'Trimmed': trimmed, 'Median': np.median(forecasts, axis=1)}
+
+
+def rls_forecasts(x, y, ends, window_size=None, refactor_every=12):
+    """
+    One-step-ahead forecasts of y ~ a + b * x for the rows in ends, each fitted on the rows
+    before it (or the last window_size of them). The first window is solved once, then
+    every month adds the newest observation and, for a rolling window, drops the oldest.
+    Downdates lose accuracy as they accumulate, so a rolling window is re-solved from its
+    own rows after every refactor_every dropped observations.
+    """
+    X = np.column_stack([np.ones(len(x)), x])
+    end = ends[0]
+    begin = 0 if window_size is None else max(end - window_size, 0)
+    rls = RecursiveLeastSquares(X[begin:end], y[begin:end])
+
+    forecasts = []
+    removed = 0
+    for target_end in ends:
+        while end < target_end:
+            rls.add(X[end], y[end])
+            end += 1
+            if window_size is not None and end - begin > window_size:
+                rls.remove(X[begin], y[begin])
+                begin += 1
+                removed += 1
+        if removed >= refactor_every:
+            rls = RecursiveLeastSquares(X[begin:end], y[begin:end])
+            removed = 0
+        forecasts.append(rls.predict(X[target_end]))
+    return forecasts
+
+
+def ols_forecasts(x, y, ends, window_size=None):
+    """
+    Same forecasts as rls_forecasts, refitting statsmodels OLS for every month.
+    """
+    forecasts = []
+    for end in ends:
+        begin = 0 if window_size is None else max(end - window_size, 0)
+        results = sm.OLS(endog=y[begin:end], exog=sm.add_constant(x[begin:end], has_constant='add')).fit()
+        forecasts.append(results.params[0] + results.params[1] * x[end])
+    return forecasts
+
+
+# Inputs shared with pool workers, attached once per process by _init_worker
+_WORKER_STATE = {}
+
+
+def _init_worker(shm_name, shape, ends):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _WORKER_STATE['shm'] = shm
+    _WORKER_STATE['values'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _WORKER_STATE['ends'] = ends
+
+
+def _forecast_job(job):
+    method, predictor_column, target_column, window_size = job
+    values = _WORKER_STATE['values']
+    forecast = rls_forecasts if method == 'rls' else ols_forecasts
+    return np.asarray(forecast(values[:, predictor_column], values[:, target_column], _WORKER_STATE['ends'],
+                               window_size))
+
+
+def train_models_parallel(data, predictors, targets, in_sample_start, in_sample_end, out_sample_start,
+                          out_sample_end, window_sizes=(None,), method='rls', n_workers=None):
+    """
+    Fit every (target, predictor, window scheme) forecasting job on a process pool.
+
+    The predictor and target columns are copied once into shared memory, so workers read
+    them in place instead of receiving a pickled DataFrame. n_workers=None uses every core
+    and n_workers=1 runs the jobs in this process. Returns a dict keyed by
+    (target, window_size) of OLSModeler objects whose forecast_df is filled exactly as
+    train_and_evaluate_models would, in a deterministic column order.
+    """
+    if method not in ('ols', 'rls'):
+        raise ValueError(f"Unknown method '{method}', expected 'ols' or 'rls'")
+    modelers = {(target, window_size): OLSModeler(data, predictors, target, in_sample_start, in_sample_end,
+                                                  out_sample_start, out_sample_end, method, window_size)
+                for target in targets for window_size in window_sizes}
+    reference = next(iter(modelers.values()))
+    reference.data['Date'] = to_month_key(reference.data['Date'])
+    forecast_dates = reference.data.loc[(reference.data['Date'] >= reference.out_sample_start) &
+                                        (reference.data['Date'] <= reference.out_sample_end), 'Date']
+    history, ends = reference._history(forecast_dates)
+
+    columns = list(dict.fromkeys(list(predictors) + list(targets)))
+    values = np.ascontiguousarray(history[columns].to_numpy(dtype=np.float64))
+    jobs = [(method, columns.index(predictor), columns.index(target), window_size)
+            for target in targets for window_size in window_sizes for predictor in predictors]
+
+    if n_workers == 1:
+        _WORKER_STATE.update(values=values, ends=ends)
+        results = [_forecast_job(job) for job in jobs]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(shm.name, values.shape, ends)) as executor:
+                results = list(executor.map(_forecast_job, jobs))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # executor.map keeps job order, so results line up with jobs
+    for (_, predictor_column, target_column, window_size), forecasts in zip(jobs, results):
+        modeler = modelers[(columns[target_column], window_size)]
+        if not hasattr(modeler, 'forecast_df'):
+            modeler.forecast_df = pd.DataFrame({'Date': forecast_dates.to_numpy()})
+        modeler.forecast_df['Forecast_' + columns[predictor_column]] = forecasts
+    return modelers
+
 
 class OLSModeler:
-    def __init__(self, data, predictors, target, in_sample_start, in_sample_end, out_sample_start, out_sample_end):
+    def __init__(self, data, predictors, target, in_sample_start, in_sample_end, out_sample_start, out_sample_end,
+                 method='ols', window_size=None):
+        """
+        method is 'ols' (refit statsmodels OLS every month), 'rls' (recursive least
+        squares updates) or 'batched' (closed-form forecasts for all predictors at
+        once). window_size=None uses an expanding window, otherwise each fit uses
+        only the last window_size months.
+        """
+        if method not in ('ols', 'rls', 'batched'):
+            raise ValueError(f"Unknown method '{method}', expected 'ols', 'rls' or 'batched'")
         self.data = data
         self.predictors = predictors
         self.target = target
-        self.in_sample_start = in_sample_start
-        self.in_sample_end = in_sample_end
-        self.out_sample_start = out_sample_start
-        self.out_sample_end = out_sample_end      
+        self.in_sample_start = to_month_key(in_sample_start)
+        self.in_sample_end = to_month_key(in_sample_end)
+        self.out_sample_start = to_month_key(out_sample_start)
+        self.out_sample_end = to_month_key(out_sample_end)
+        self.method = method
+        self.window_size = window_size
 
     def train_and_evaluate_models(self):
 
         # Initialize an empty list to store recursive mean estimates for SP500
-        self.data['Date'] = pd.to_datetime(self.data['Date'])         
+        self.data['Date'] = to_month_key(self.data['Date'])         
 
         # Filter data for in-sample and out-of-sample periods
         in_sample_end_dyn = self.data[(self.data['Date'] >= self.out_sample_start) & (self.data['Date'] <= self.out_sample_end)].copy()['Date']        
@@ -31,35 +306,110 @@ class OLSModeler:
         #Drop colum of old index
         self.forecast_df = self.forecast_df.drop(columns=['index'])
         
+        if self.method == 'batched':
+            self._batched_forecasts(in_sample_end_dyn)
+            return
+
         for predictor in self.predictors:
-            recursive_means = []            
+            if self.method == 'rls':
+                recursive_means = self._rls_forecasts(predictor, in_sample_end_dyn)
+            else:
+                recursive_means = self._ols_forecasts(predictor, in_sample_end_dyn)
+
+        #Consolidate all forecasts in one column
+            self.recursive_means_df = pd.DataFrame(recursive_means, columns = ['Forecast_'+ predictor])      
+        #For each predictor, concatenate it
+            self.forecast_df = pd.merge(self.forecast_df, self.recursive_means_df, left_index=True, right_index=True, how = 'left')
+
+    def _batched_forecasts(self, forecast_dates):
+        """
+        Fill forecast_df with the closed-form forecasts of every predictor in one pass.
+        """
+        history, ends = self._history(forecast_dates)
+        forecasts = univariate_forecast_kernel(history[self.predictors].to_numpy(dtype=float),
+                                               history[[self.target]].to_numpy(dtype=float),
+                                               ends, self.window_size)
+        for position, predictor in enumerate(self.predictors):
+            self.forecast_df['Forecast_' + predictor] = forecasts[position, 0]
+
+    def _ols_forecasts(self, predictor, forecast_dates):
+        recursive_means = []
         #Does a recursive approach of re-evaluating the OLS model for each new monthly observation
-            for i in in_sample_end_dyn:
-                in_sample_data = self.data[(self.data['Date'] >= self.in_sample_start) & (self.data['Date'] < i)]
-                out_sample_point = self.data[(self.data['Date'] == i)].copy()
+        for i in forecast_dates:
+            in_sample_data = self.data[(self.data['Date'] >= self.in_sample_start) & (self.data['Date'] < i)]
+            if self.window_size is not None:
+                in_sample_data = in_sample_data.iloc[-self.window_size:]
+            out_sample_point = self.data[(self.data['Date'] == i)].copy()
             #x and y for OLS regression
-                x = in_sample_data[predictor]
-                y = in_sample_data[self.target]            
+            x = in_sample_data[predictor]
+            y = in_sample_data[self.target]
             # Calculate the OLS for the in-sample period and get predicted "a + bx" results for the entire data
-                x = sm.add_constant(x)
-                model = sm.OLS(endog = y, exog = x)
-                results = model.fit()
+            x = sm.add_constant(x)
+            model = sm.OLS(endog = y, exog = x)
+            results = model.fit()
             # This initial prediction (in-sample and out-sample) will be used for the recursive estimation
-                ypred = results.predict((1, float(out_sample_point[predictor])))    
+            ypred = results.predict((1, out_sample_point[predictor].iloc[0]))
             #It's necessary to align prediction dimensions
-                ypred = ypred[0]
+            ypred = ypred[0]
             #Append the estimate
-                recursive_means.append(ypred)
-                
-        #Consolidate all forecasts in one column
-            self.recursive_means_df = pd.DataFrame(recursive_means, columns = ['Forecast_'+ predictor])      
-        #For each predictor, concatenate it
-            self.forecast_df = pd.merge(self.forecast_df, self.recursive_means_df, left_index=True, right_index=True, how = 'left')
+            recursive_means.append(ypred)
+        return recursive_means
+
+    def _history(self, forecast_dates):
+        """
+        Rows from in_sample_start on, sorted by date, and the position of each forecast month.
+        Rows before that position form the month's estimation sample.
+        """
+        history = self.data[self.data['Date'] >= self.in_sample_start].sort_values('Date', kind='stable')
+        return history, np.searchsorted(history['Date'].to_numpy(), np.asarray(forecast_dates))
+
+    def _rls_forecasts(self, predictor, forecast_dates):
+        history, ends = self._history(forecast_dates)
+        return rls_forecasts(history[predictor].to_numpy(dtype=float), history[self.target].to_numpy(dtype=float),
+                             ends, self.window_size)
             
-    def combined_forecast(self):
-        #Combined forecast(simple average)        
-        self.forecast_df['Combined_Forecast'] = self.forecast_df.mean(axis= 1, numeric_only = True)      
-        self.forecast_df['Date'] = self.forecast_df['Date'].dt.strftime('%m-%Y')
+    def add_subset_forecasts(self, subset_sizes=None):
+        """
+        Add multivariate forecasts to forecast_df (after train_and_evaluate_models): the
+        kitchen-sink model as 'Forecast_Kitchen_Sink' and, for every other subset size k > 1,
+        the complete subset regression (mean over all k-predictor models) as 'Forecast_CSR_<k>'.
+        Returns the forecasts of every individual subset model and the subsets.
+        """
+        history, ends = self._history(self.forecast_df['Date'])
+        forecasts, subsets = subset_regression_forecasts(history[self.predictors].to_numpy(dtype=float),
+                                                         history[[self.target]].to_numpy(dtype=float),
+                                                         ends, self.window_size, subset_sizes)
+        sizes = np.array([len(subset) for subset in subsets])
+        for size in np.unique(sizes):
+            if size == 1:
+                continue  # the simple mean of the univariate forecasts is Combined_Forecast
+            name = 'Forecast_Kitchen_Sink' if size == len(self.predictors) else f'Forecast_CSR_{size}'
+            self.forecast_df[name] = forecasts[sizes == size, 0].mean(axis=0)
+        return forecasts[:, 0], subsets
+
+    def combined_forecast(self, schemes=('mean',), theta=1.0, holdout=12, trim=1):
+        """
+        Combine the univariate Forecast_<predictor> columns; subset forecasts from
+        add_subset_forecasts are not pooled. 'mean' writes Combined_Forecast (simple average);
+        'dmspe', 'trimmed' and 'median' write Combined_Forecast_DMSPE, _Trimmed and _Median
+        (see combination_forecasts for theta, holdout and trim).
+        """
+        unknown = set(schemes) - set(COMBINATION_SCHEMES) - {'mean'}
+        if unknown:
+            raise ValueError(f'Unknown combination schemes {sorted(unknown)}')
+        model_columns = [f'Forecast_{predictor}' for predictor in self.predictors]
+        other_schemes = [scheme for scheme in schemes if scheme != 'mean']
+        if other_schemes:
+            history, ends = self._history(self.forecast_df['Date'])
+            combined = combination_forecasts(self.forecast_df[model_columns].to_numpy(dtype=float)[:, :, None],
+                                             history[self.target].to_numpy(dtype=float)[ends], theta, holdout, trim)
+
+        #Combined forecast(simple average)
+        if 'mean' in schemes:
+            self.forecast_df['Combined_Forecast'] = self.forecast_df[model_columns].mean(axis= 1, numeric_only = True)
+        for scheme in other_schemes:
+            label = COMBINATION_SCHEMES[scheme]
+            self.forecast_df[f'Combined_Forecast_{label}'] = combined[label][:, 0]
                 
     def save_model(self, task_prefix='g3.3'):
         forecast_sheet_name = f'{task_prefix}_Forecasts_{self.target}'
@@ -70,16 +420,18 @@ class OLSModeler:
         else:
             forecast_sheet_name = f'{task_prefix}_Forecast_Excess_R_Bonds'
         
-        print(self.forecast_df.head())
+        # forecast_df keeps month keys; the sheets hold '%m-%Y' dates
+        output = self.forecast_df.assign(Date=month_key_to_str(self.forecast_df['Date']))
+        print(output.head())
         
         # with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
-        #     self.forecast_df.to_excel(writer, sheet_name=forecast_sheet_name)
+        #     output.to_excel(writer, sheet_name=forecast_sheet_name)
         # print(f"Forecasts saved in sheet: {forecast_sheet_name}")
         # print('-'*50)
 
-def g3_1_2_3_demo():
+def g3_1_2_3_demo(n_workers=1):
     file_path = 'data.xlsx'
-    data = pd.read_excel(file_path, sheet_name='data')
+    data = read_merged_data(file_path)
 
     predictors = ['E12', 'b/m', 'tbl', 'ntis', 'infl']
     targets = ['Excess_Return_Stocks', 'Excess_Return_Bonds']
@@ -90,6 +442,15 @@ def g3_1_2_3_demo():
     out_sample_start = "2000-01-01"
     out_sample_end = "2021-12-01" #This is equivalent to 2021-12-31 (last observation)
     
+    if n_workers != 1:
+        # Fan the (target, predictor) fits out over a process pool, every core for n_workers=None
+        modelers = train_models_parallel(data, predictors, targets, in_sample_start, in_sample_end,
+                                         out_sample_start, out_sample_end, n_workers=n_workers)
+        for modeler in modelers.values():
+            modeler.combined_forecast()
+            modeler.save_model()
+        return
+
     for target in targets:
         #Now receives data and return 'Forecast_ + predictor' saved in a sheet for target
         modeler = OLSModeler(data, predictors, target, in_sample_start, in_sample_end, out_sample_start, out_sample_end)
@@ -98,10 +459,10 @@ def g3_1_2_3_demo():
         modeler.save_model()
 
 
-def g6_3_1_2_3_demo():
+def g6_3_1_2_3_demo(n_workers=1):
     print('Task 6.3.1-3:')
     file_path = 'data.xlsx'
-    data = pd.read_excel(file_path, sheet_name='data')
+    data = read_merged_data(file_path)
 
     predictors = ['E12', 'b/m', 'tbl', 'ntis', 'infl']
     targets = ['Excess_Return_Stocks', 'Excess_Return_Bonds']
@@ -112,6 +473,15 @@ def g6_3_1_2_3_demo():
     out_sample_start = "2000-01-01"
     out_sample_end = "2021-12-01"  # This is equivalent to 2021-12-31 (last observation)
 
+    if n_workers != 1:
+        # Fan the (target, predictor) fits out over a process pool, every core for n_workers=None
+        modelers = train_models_parallel(data, predictors, targets, in_sample_start, in_sample_end,
+                                         out_sample_start, out_sample_end, n_workers=n_workers)
+        for modeler in modelers.values():
+            modeler.combined_forecast()
+            modeler.save_model(task_prefix='g6.3.3')
+        return
+
     for target in targets:
         # Now receives data and return 'Forecast_ + predictor' saved in a sheet for target
         modeler = OLSModeler(data, predictors, target, in_sample_start, in_sample_end, out_sample_start, out_sample_end)
@@ -1,4 +1,50 @@
+import numpy as np
 import pandas as pd
+from g0 import read_excel_cached, read_merged_data, to_month_key
+
+# Forecast columns scored for each asset class and their result names
+MODEL_NAMES = {
+    'Forecast_E12': 'E12 Forecast MSFE',
+    'Forecast_b/m': 'Book-to-Market Ratio Forecast MSFE',
+    'Forecast_tbl': 'Treasury Bill Rate Forecast MSFE',
+    'Forecast_ntis': 'Net Equity Expansion Forecast MSFE',
+    'Forecast_infl': 'Inflation Forecast MSFE',
+    'Combined_Forecast': 'Combined Forecast MSFE'
+}
+
+
+def forecast_accuracy(forecasts, actuals, benchmark):
+    """
+    Score a (models x assets x T) forecast array against (assets x T) actuals and
+    benchmark forecasts in one broadcasted computation. Each model is compared with the
+    benchmark only over the months where both have an error, so models with different
+    missing months are not scored on different samples.
+
+    Returns a dict with 'msfe' (models x assets) and 'paired_benchmark_msfe' (models x
+    assets) over those shared months, the benchmark's own 'benchmark_msfe' (assets) over
+    all its months, 'msfe_ratio', the Campbell-Thompson out-of-sample 'r2_os' =
+    1 - msfe_ratio, and the 'cumulative_sse_difference' (models x assets x T): the running
+    sum of benchmark minus model squared errors, which rises while a model beats the benchmark.
+    """
+    forecasts = np.asarray(forecasts, dtype=float)
+    actuals = np.asarray(actuals, dtype=float)
+    model_errors = (actuals[None] - forecasts) ** 2
+    benchmark_errors = (actuals - np.asarray(benchmark, dtype=float)) ** 2
+
+    shared = ~np.isnan(model_errors) & ~np.isnan(benchmark_errors)[None]
+    paired_benchmark_errors = np.where(shared, benchmark_errors[None], np.nan)
+    model_errors = np.where(shared, model_errors, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        counts = shared.sum(axis=-1)
+        msfe = np.nansum(model_errors, axis=-1) / counts
+        paired_benchmark_msfe = np.nansum(paired_benchmark_errors, axis=-1) / counts
+        msfe_ratio = msfe / paired_benchmark_msfe
+    benchmark_msfe = np.nanmean(benchmark_errors, axis=-1)
+    difference = np.nan_to_num(paired_benchmark_errors - model_errors)
+    return {'msfe': msfe, 'benchmark_msfe': benchmark_msfe, 'paired_benchmark_msfe': paired_benchmark_msfe,
+            'msfe_ratio': msfe_ratio, 'r2_os': 1 - msfe_ratio,
+            'cumulative_sse_difference': np.cumsum(difference, axis=-1)}
+
 
 class MSFECalculator:
     """
@@ -9,12 +55,15 @@ class MSFECalculator:
         self.data = None
         self.msfe_results = {}
         self.msfe_ratios = {}
+        self.r2_os = {}
+        self.accuracy = None
 
     def load_data(self):
         """
         Load necessary data from Excel file.
         """
-        self.data = pd.read_excel(self.file_path, sheet_name=None)
+        self.data = read_excel_cached(self.file_path, sheet_name=None)
+        self.data['data'] = read_merged_data(self.file_path)
 
     def calculate_msfe(self, actuals, forecasts):
         """
@@ -22,87 +71,53 @@ class MSFECalculator:
         """
         return ((actuals - forecasts) ** 2).mean()
 
-    def calculate_msfe_ratios(self, benchmark_name):
+    def calculate_msfe_ratios(self, benchmark_name, result_names):
         """
-        Calculate MSFE ratios for each model relative to the benchmark.
+        Calculate MSFE ratios for each model relative to the benchmark of the same asset class.
         """
         benchmark_msfe = self.msfe_results[benchmark_name]
 
-        for key, value in self.msfe_results.items():
-            if key != benchmark_name:
-                self.msfe_ratios[f'{key} Ratio'] = value / benchmark_msfe
+        for key in result_names:
+            self.msfe_ratios[f'{key} Ratio'] = self.msfe_results[key] / benchmark_msfe
 
     def process_forecasts(self,
                           sheet_prefix1='g2',
                           sheet_prefix2='g3.3'):
         """
-        Process each forecast and calculate its MSFE.
-        """      
-        actuals_stocks = self.data['data']['Excess_Return_Stocks']
-        actuals_bonds = self.data['data']['Excess_Return_Bonds']
-
-        # Mapping of sheet names and columns to meaningful result names
+        Score every forecast of both asset classes with one call to forecast_accuracy.
+        """
         if sheet_prefix1 == 'g6.2':
             mu = 'Mu'
         else:
             mu = 'Mean'
-        meaningful_names = {
-            f'{sheet_prefix1}.SP500_Monthly_{mu}_Forecast': {'Mean_Forecast': 'SP500 Mean Forecast MSFE'},
-            f'{sheet_prefix2}_Forecast_Excess_R_Stocks': {
-                'Forecast_E12': 'Stocks E12 Forecast MSFE',
-                'Forecast_b/m': 'Stocks Book-to-Market Ratio Forecast MSFE',
-                'Forecast_tbl': 'Stocks Treasury Bill Rate Forecast MSFE',
-                'Forecast_ntis': 'Stocks Net Equity Expansion Forecast MSFE',
-                'Forecast_infl': 'Stocks Inflation Forecast MSFE',
-                'Combined_Forecast': 'Stocks Combined Forecast MSFE'
-            },
-            f'{sheet_prefix1}.Bonds_Monthly_{mu}_Forecast': {'Mean_Forecast': 'Bonds Mean Forecast MSFE'},
-            f'{sheet_prefix2}_Forecast_Excess_R_Bonds': {
-                'Forecast_E12': 'Bonds E12 Forecast MSFE',
-                'Forecast_b/m': 'Bonds Book-to-Market Ratio Forecast MSFE',
-                'Forecast_tbl': 'Bonds Treasury Bill Rate Forecast MSFE',
-                'Forecast_ntis': 'Bonds Net Equity Expansion Forecast MSFE',
-                'Forecast_infl': 'Bonds Inflation Forecast MSFE',
-                'Combined_Forecast': 'Bonds Combined Forecast MSFE'
-            }
-        }
-
-        # Calculate MSFE for each model
-        for sheet, name_mappings in meaningful_names.items():
-            for column, result_name in name_mappings.items():
-                forecasts = self.data[sheet][column]               
-                
-                #Index for filter
-                out_sample_start_index = len(actuals_stocks) - len(forecasts) 
-                out_sample_end_index = len(actuals_stocks)-1                     
-                
-                actuals = actuals_stocks.iloc[out_sample_start_index : out_sample_end_index+1] if result_name.__contains__('Stocks') or result_name.__contains__('SP500') else actuals_bonds.iloc[out_sample_start_index : out_sample_end_index+1]
-                
-                
-                if result_name.__contains__('Stocks') or result_name.__contains__('SP500'):
-                    benchmark = self.data[f'{sheet_prefix1}.SP500_Monthly_{mu}_Forecast']['Mean_Forecast']
-                    benchmark = benchmark.array
-                    self.msfe_results['SP500 Mean Forecast MSFE'] = self.calculate_msfe(actuals, benchmark)
-                    benchmark_mean = self.msfe_results['SP500 Mean Forecast MSFE']
-                    
-                                      
-                else: 
-                    benchmark = self.data[f'{sheet_prefix1}.Bonds_Monthly_{mu}_Forecast']['Mean_Forecast']
-                    benchmark = benchmark.array
-                    self.msfe_results['Bonds Mean Forecast MSFE'] = self.calculate_msfe(actuals, benchmark)
-                    benchmark_mean = self.msfe_results['Bonds Mean Forecast MSFE']
-                    
-                    #Transform to array
-                actuals = actuals.array
-                forecasts = forecasts.array
-                    
-                    #Caclculate results
-                self.msfe_results[result_name] = self.calculate_msfe(actuals, forecasts)
-                self.msfe_results[result_name + ' Ratio'] = self.msfe_results[result_name]/benchmark_mean
-
-        # Calculate MSFE ratios
-        self.calculate_msfe_ratios('SP500 Mean Forecast MSFE')
-        self.calculate_msfe_ratios('Bonds Mean Forecast MSFE')
+        # (result name prefix, benchmark result name, actuals column, benchmark sheet, forecast sheet)
+        assets = [
+            ('Stocks', 'SP500 Mean Forecast MSFE', 'Excess_Return_Stocks',
+             f'{sheet_prefix1}.SP500_Monthly_{mu}_Forecast', f'{sheet_prefix2}_Forecast_Excess_R_Stocks'),
+            ('Bonds', 'Bonds Mean Forecast MSFE', 'Excess_Return_Bonds',
+             f'{sheet_prefix1}.Bonds_Monthly_{mu}_Forecast', f'{sheet_prefix2}_Forecast_Excess_R_Bonds'),
+        ]
+
+        benchmark = np.array([self.data[benchmark_sheet]['Mean_Forecast'].to_numpy(dtype=float)
+                              for _, _, _, benchmark_sheet, _ in assets])
+        # Realised returns of the benchmark's forecast months, looked up by month key
+        data = self.data['data'].set_index(to_month_key(self.data['data']['Date']))
+        actuals = np.array([data[column].reindex(to_month_key(self.data[benchmark_sheet]['Date'])).to_numpy(dtype=float)
+                            for _, _, column, benchmark_sheet, _ in assets])
+        forecasts = np.array([[self.data[sheet][column].to_numpy(dtype=float) for _, _, _, _, sheet in assets]
+                              for column in MODEL_NAMES])
+        self.accuracy = forecast_accuracy(forecasts, actuals, benchmark)
+
+        for position, (label, benchmark_name, _, _, _) in enumerate(assets):
+            self.msfe_results[benchmark_name] = float(self.accuracy['benchmark_msfe'][position])
+            self.msfe_results[benchmark_name + ' Ratio'] = 1.0
+            for model, (column, name) in enumerate(MODEL_NAMES.items()):
+                result_name = f'{label} {name}'
+                self.msfe_results[result_name] = float(self.accuracy['msfe'][model, position])
+                # Ratios compare each model with the benchmark over their shared months
+                self.msfe_results[result_name + ' Ratio'] = float(self.accuracy['msfe_ratio'][model, position])
+                self.msfe_ratios[f'{result_name} Ratio'] = float(self.accuracy['msfe_ratio'][model, position])
+                self.r2_os[f'{label} {name.replace(" MSFE", "")} R2_OS'] = float(self.accuracy['r2_os'][model, position])
                
         
     def save_results(self,
@@ -1,6 +1,138 @@
 import pandas as pd
 from scipy import stats
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from g0 import read_excel_cached, read_merged_data, to_month_key
+
+
+def newey_west_variance(d, lag=4, fft=None):
+    """
+    Newey-West (Bartlett kernel) long-run variance of every column of a (T x K) matrix of
+    loss differentials, gamma_0 + 2 * sum_k (1 - k / (lag + 1)) * gamma_k for k = 1..lag.
+    Autocovariances of all columns are computed together, through an FFT when the lag
+    count is large (fft=None picks automatically).
+    """
+    d = np.asarray(d, dtype=float).reshape(len(d), -1)
+    T = len(d)
+    centered = d - d.mean(axis=0)
+    if fft is None:
+        fft = lag > 32
+    if fft:
+        n = 1 << int(np.ceil(np.log2(2 * T)))
+        spectrum = np.fft.rfft(centered, n=n, axis=0)
+        covariances = np.fft.irfft(spectrum * spectrum.conj(), n=n, axis=0)[:lag + 1] / T
+    else:
+        covariances = np.array([(centered[:T - k] * centered[k:]).sum(axis=0) / T for k in range(lag + 1)])
+    weights = 2 * (1 - np.arange(lag + 1) / (lag + 1))
+    weights[0] = 1
+    return weights @ covariances
+
+
+def forecast_comparison_tests(actuals, forecasts, benchmark, lag=4):
+    """
+    Diebold-Mariano and Clark-West tests of every model against the benchmark at once.
+
+    forecasts is (models x assets x T), actuals and benchmark are (assets x T). Returns a
+    dict of (models x assets) arrays: the DM statistic and p-value (H0: equal MSFE, with
+    the p-value convention of perform_dm_test) and the Clark-West statistic and one-sided
+    p-value (H0: the model does not improve on the benchmark).
+    """
+    forecasts = np.asarray(forecasts, dtype=float)
+    actuals = np.asarray(actuals, dtype=float)[None]
+    benchmark = np.asarray(benchmark, dtype=float)[None]
+    n_models, n_assets, T = forecasts.shape
+
+    model_errors = (actuals - forecasts) ** 2
+    benchmark_errors = np.broadcast_to((actuals - benchmark) ** 2, forecasts.shape)
+    dm_loss = model_errors - benchmark_errors
+    cw_loss = benchmark_errors - (model_errors - (benchmark - forecasts) ** 2)
+
+    # Both loss series go through one HAC call as columns of a (T x 2 * models * assets) matrix
+    losses = np.concatenate([dm_loss, cw_loss]).reshape(-1, T).T
+    se = np.sqrt(newey_west_variance(losses, lag) / T).reshape(2, n_models, n_assets)
+    means = losses.mean(axis=0).reshape(2, n_models, n_assets)
+    dm_stat, cw_stat = means / se
+    return {'dm_stat': dm_stat, 'dm_p_value': stats.norm.cdf(-np.abs(dm_stat)),
+            'cw_stat': cw_stat, 'cw_p_value': stats.norm.sf(cw_stat)}
+
+
+def stationary_bootstrap_counts(T, n_boot, block_length, rng):
+    """
+    Politis-Romano stationary bootstrap of T observations, n_boot resamples at once.
+    Returns an (n_boot x T) matrix counting how often each observation is drawn, so that
+    the resampled means of any (T x K) series are counts @ series / T.
+    """
+    steps = np.arange(T)
+    new_block = rng.random((n_boot, T)) < 1.0 / block_length
+    new_block[:, 0] = True
+    starts = rng.integers(0, T, size=(n_boot, T))
+    # Position at which the current block began, then wrap around the sample from there
+    block_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+    indices = (np.take_along_axis(starts, block_start, axis=1) + steps - block_start) % T
+    offsets = (np.arange(n_boot) * T)[:, None]
+    return np.bincount((indices + offsets).ravel(), minlength=n_boot * T).reshape(n_boot, T)
+
+
+_BOOTSTRAP_STATE = {}
+
+
+def _init_bootstrap_worker(differentials):
+    _BOOTSTRAP_STATE['differentials'] = differentials
+
+
+def _bootstrap_batch(job):
+    n_boot, block_length, seed = job
+    differentials = _BOOTSTRAP_STATE['differentials']
+    counts = stationary_bootstrap_counts(len(differentials), n_boot, block_length, np.random.default_rng(seed))
+    return counts @ differentials / len(differentials)
+
+
+def superior_predictive_ability(benchmark_losses, model_losses, n_boot=1000, block_length=10, seed=0,
+                                n_workers=None, batch_size=250):
+    """
+    White's Reality Check and Hansen's SPA test of H0: no model beats the benchmark.
+
+    benchmark_losses is (T,) and model_losses (T x models), e.g. squared forecast errors.
+    Bootstrap batches run on a process pool, each with its own child of SeedSequence(seed),
+    so results depend only on seed and batch_size, not on n_workers. Returns a dict with
+    the RC statistic and p-value and the SPA statistic with its lower, consistent and
+    upper p-values.
+    """
+    model_losses = np.asarray(model_losses, dtype=float).reshape(len(model_losses), -1)
+    differentials = np.asarray(benchmark_losses, dtype=float)[:, None] - model_losses
+    T = len(differentials)
+    mean_differentials = differentials.mean(axis=0)
+
+    batches = [min(batch_size, n_boot - start) for start in range(0, n_boot, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    jobs = list(zip(batches, [block_length] * len(batches), seeds))
+    if n_workers == 1:
+        _init_bootstrap_worker(differentials)
+        boot_means = np.concatenate([_bootstrap_batch(job) for job in jobs])
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_bootstrap_worker,
+                                 initargs=(differentials,)) as executor:
+            boot_means = np.concatenate(list(executor.map(_bootstrap_batch, jobs)))
+    centered = boot_means - mean_differentials
+
+    # Reality Check: largest unstandardised mean differential
+    rc_stat = np.sqrt(T) * mean_differentials.max()
+    rc_p_value = np.mean(np.sqrt(T) * centered.max(axis=1) > rc_stat)
+
+    # SPA: studentise with the bootstrap variance, recentre poor models by lower / consistent / upper rules
+    omega = np.sqrt(T * np.mean(centered ** 2, axis=0))
+    omega[omega == 0] = np.inf
+    spa_stat = max(np.max(np.sqrt(T) * mean_differentials / omega), 0.0)
+    threshold = -omega / np.sqrt(T) * np.sqrt(2 * np.log(np.log(T)))
+    recentering = {'lower': np.minimum(mean_differentials, 0),
+                   'consistent': np.where(mean_differentials <= threshold, mean_differentials, 0),
+                   'upper': np.zeros_like(mean_differentials)}
+    results = {'rc_stat': rc_stat, 'rc_p_value': rc_p_value, 'spa_stat': spa_stat}
+    for name, mu in recentering.items():
+        boot_stat = np.maximum(np.max(np.sqrt(T) * (centered + mu) / omega, axis=1), 0.0)
+        results[f'spa_p_value_{name}'] = np.mean(boot_stat > spa_stat)
+    return results
+
 
 class DmTestCalculator:
     def __init__(self, file_path, out_sample_start, out_sample_end):
@@ -8,23 +140,26 @@ class DmTestCalculator:
         self.data = None
         self.dm_test_stocks_results = pd.DataFrame(columns=['p-value', 'conclusion'])
         self.dm_test_bonds_results = pd.DataFrame(columns=['p-value', 'conclusion'])
-        self.out_sample_start = out_sample_start
-        self.out_sample_end = out_sample_end
+        self.cw_test_stocks_results = pd.DataFrame(columns=['statistic', 'p-value', 'conclusion'])
+        self.cw_test_bonds_results = pd.DataFrame(columns=['statistic', 'p-value', 'conclusion'])
+        self.spa_results = pd.DataFrame()
+        self.out_sample_start = to_month_key(out_sample_start)
+        self.out_sample_end = to_month_key(out_sample_end)
 
     def load_data(self):
-        self.data = pd.read_excel(self.file_path, sheet_name=None)
+        self.data = read_excel_cached(self.file_path, sheet_name=None)
+        self.data['data'] = read_merged_data(self.file_path)
 
     def newey_west_se(self, errors, lag=4):
         """
         Calculate the Newey-West standard error of the mean forecast error.
+
+        Kept with the original scaling (every autocovariance, gamma_0 included, doubled) so
+        that perform_dm_test reproduces earlier results; run_tests uses newey_west_variance.
         """
-        T = len(errors)
-        covariances = np.zeros(lag + 1)
-        for k in range(lag + 1):
-            cov = np.sum((errors[:T - k] - errors.mean()) * (errors[k:] - errors.mean())) / T
-            covariances[k] = cov
-        weights = 1 - np.arange(lag + 1) / (lag + 1)
-        return np.sqrt(2 * np.dot(weights, covariances) / T)
+        errors = np.asarray(errors, dtype=float)
+        gamma_0 = np.var(errors)
+        return np.sqrt((newey_west_variance(errors, lag)[0] + gamma_0) / len(errors))
 
     def perform_dm_test(self, actuals, forecast1, forecast2, lag=4):
         e1 = actuals - forecast1
@@ -42,12 +177,12 @@ class DmTestCalculator:
         conclusion = 'Reject H0' if p_value < 0.025 else 'Failed to reject H0'
         return p_value, conclusion
 
-    def run_tests(self,
-                  sheet_prefix1='g2',
-                  sheet_prefix2='g3.3'):
-
+    def _out_of_sample_series(self, sheet_prefix1, sheet_prefix2):
+        """
+        (forecast sheet, actuals, benchmark) for stocks and bonds over the out-of-sample period.
+        """
         # Initialize an empty list to store recursive mean estimates for SP500
-        self.data['data']['Date'] = pd.to_datetime(self.data['data']['Date']) 
+        self.data['data']['Date'] = to_month_key(self.data['data']['Date']) 
         
         #Index to filter out-of-sample periods
         out_sample_start_index = self.data['data'][(self.data['data']['Date'] == self.out_sample_start)].index  
@@ -67,30 +202,57 @@ class DmTestCalculator:
         benchmark_bonds = self.data[f'{sheet_prefix1}.Bonds_Monthly_{mu}_Forecast']['Mean_Forecast']
         
         #Transforming to array
-        actuals_stocks = actuals_stocks.array
-        actuals_bonds = actuals_bonds.array
-        benchmark_stocks = benchmark_stocks.array
-        benchmark_bonds = benchmark_bonds.array
-              
-        
-        for sheet in [f'{sheet_prefix2}_Forecast_Excess_R_Stocks',
-                      f'{sheet_prefix2}_Forecast_Excess_R_Bonds']:
-            for column in self.data[sheet].columns:
-                if column not in ['Date', 'Unnamed: 0']:
-                    forecasts = self.data[sheet][column]
-                    forecasts = forecasts.array
-                    
-                    if 'Stocks' in sheet:
-                        actuals = actuals_stocks
-                        benchmark = benchmark_stocks
-                        p_value, conclusion = self.perform_dm_test(actuals, forecasts, benchmark)
-                        self.dm_test_stocks_results.loc[column] = [p_value, conclusion]
-                        
-                    else:
-                        benchmark = benchmark_bonds
-                        p_value, conclusion = self.perform_dm_test(actuals_bonds, forecasts, benchmark)
-                        self.dm_test_bonds_results.loc[column] = [p_value, conclusion]                   
-                    
+        actuals_stocks = actuals_stocks.to_numpy(dtype=float)
+        actuals_bonds = actuals_bonds.to_numpy(dtype=float)
+        benchmark_stocks = benchmark_stocks.to_numpy(dtype=float)
+        benchmark_bonds = benchmark_bonds.to_numpy(dtype=float)
+
+        return [(f'{sheet_prefix2}_Forecast_Excess_R_Stocks', actuals_stocks, benchmark_stocks),
+                (f'{sheet_prefix2}_Forecast_Excess_R_Bonds', actuals_bonds, benchmark_bonds)]
+
+    def run_tests(self,
+                  sheet_prefix1='g2',
+                  sheet_prefix2='g3.3'):
+
+        for sheet, actuals, benchmark in self._out_of_sample_series(sheet_prefix1, sheet_prefix2):
+            columns = [column for column in self.data[sheet].columns if column not in ['Date', 'Unnamed: 0']]
+            forecasts = self.data[sheet][columns].to_numpy(dtype=float).T[:, None, :]
+            results = forecast_comparison_tests(actuals[None], forecasts, benchmark[None])
+
+            #Bilateral 95% confidence level for DM, one-sided 5% for Clark-West
+            dm_p_value = results['dm_p_value'][:, 0]
+            dm_results = pd.DataFrame({'p-value': dm_p_value,
+                                       'conclusion': np.where(dm_p_value < 0.025, 'Reject H0', 'Failed to reject H0')},
+                                      index=columns)
+            cw_p_value = results['cw_p_value'][:, 0]
+            cw_results = pd.DataFrame({'statistic': results['cw_stat'][:, 0], 'p-value': cw_p_value,
+                                       'conclusion': np.where(cw_p_value < 0.05, 'Reject H0', 'Failed to reject H0')},
+                                      index=columns)
+            if 'Stocks' in sheet:
+                self.dm_test_stocks_results, self.cw_test_stocks_results = dm_results, cw_results
+            else:
+                self.dm_test_bonds_results, self.cw_test_bonds_results = dm_results, cw_results
+
+    def run_spa_tests(self,
+                      sheet_prefix1='g2',
+                      sheet_prefix2='g3.3',
+                      n_boot=1000,
+                      block_length=10,
+                      seed=0,
+                      n_workers=None):
+        """
+        Reality Check and SPA tests of all Forecast_* models jointly against the benchmark,
+        on squared forecast errors. Rows of self.spa_results are the two assets.
+        """
+        rows = {}
+        for sheet, actuals, benchmark in self._out_of_sample_series(sheet_prefix1, sheet_prefix2):
+            columns = [column for column in self.data[sheet].columns if column not in ['Date', 'Unnamed: 0']]
+            forecasts = self.data[sheet][columns].to_numpy(dtype=float)
+            asset = 'Stocks' if 'Stocks' in sheet else 'Bonds'
+            rows[asset] = superior_predictive_ability((actuals - benchmark) ** 2, (actuals[:, None] - forecasts) ** 2,
+                                                      n_boot, block_length, seed, n_workers)
+        self.spa_results = pd.DataFrame(rows).T
+
 
 def g3_5_demo():
      # Set the boundaries for in-sample and out-of-sample periods
@@ -104,6 +266,12 @@ def g3_5_demo():
     print('\nStocks:\n', dm_test_calculator.dm_test_stocks_results)
     print('-'*50)
     print('\nBonds:\n', dm_test_calculator.dm_test_bonds_results)
+    print('-'*50)
+    print('\nClark-West, Stocks:\n', dm_test_calculator.cw_test_stocks_results)
+    print('\nClark-West, Bonds:\n', dm_test_calculator.cw_test_bonds_results)
+    print('-'*50)
+    dm_test_calculator.run_spa_tests()
+    print('\nReality Check / SPA:\n', dm_test_calculator.spa_results)
 
 
 def g6_3_5_demo():
@@ -122,6 +290,12 @@ def g6_3_5_demo():
     print('\nStocks:\n', dm_test_calculator.dm_test_stocks_results)
     print('-' * 50)
     print('\nBonds:\n', dm_test_calculator.dm_test_bonds_results)
+    print('-'*50)
+    print('\nClark-West, Stocks:\n', dm_test_calculator.cw_test_stocks_results)
+    print('\nClark-West, Bonds:\n', dm_test_calculator.cw_test_bonds_results)
+    print('-'*50)
+    dm_test_calculator.run_spa_tests(sheet_prefix1, sheet_prefix2)
+    print('\nReality Check / SPA:\n', dm_test_calculator.spa_results)
 
 
 if __name__ == '__main__':
@@ -1,27 +1,201 @@
-import pandas as pd
+import warnings
 import numpy as np
 from sklearn.linear_model import Lasso, Ridge
 import matplotlib.pyplot as plt
+from g0 import read_excel_cached, read_merged_data, to_month_key, month_key_to_timestamp
+
+
+def window_moments(X, Y, ends, window_size=None):
+    """
+    Sufficient statistics of every estimation window [begin, end) from prefix sums: sample
+    sizes, window means of X and of the targets Y (T x N), the centred Gram matrices X'X
+    (months x P x P), X'Y (months x P x N) and the diagonal of Y'Y. Expanding or rolling,
+    each new month is an O(P^2) update on top of one pass over the data.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+    ends = np.asarray(ends)
+    begins = np.zeros_like(ends) if window_size is None else np.maximum(ends - window_size, 0)
+    n = (ends - begins).astype(float)
+
+    # Shift by the full-sample means first so the window sums do not cancel badly
+    y_shift = Y.mean(axis=0)
+    X = X - X.mean(axis=0)
+    Z = np.column_stack([X, Y - y_shift])
+    sums = np.zeros((len(Z) + 1, Z.shape[1]))
+    products = np.zeros((len(Z) + 1, Z.shape[1], Z.shape[1]))
+    np.cumsum(Z, axis=0, out=sums[1:])
+    np.cumsum(Z[:, :, None] * Z[:, None, :], axis=0, out=products[1:])
+    means = (sums[ends] - sums[begins]) / n[:, None]
+    centered = products[ends] - products[begins] - n[:, None, None] * means[:, :, None] * means[:, None, :]
+    p = X.shape[1]
+    return {'n': n, 'mean_x': means[:, :p], 'mean_y': means[:, p:] + y_shift, 'x_new': X[ends],
+            'gram': centered[:, :p, :p], 'cross': centered[:, :p, p:],
+            'yy': np.diagonal(centered[:, p:, p:], axis1=1, axis2=2)}
+
+
+def standardized_moments(moments):
+    """
+    window_moments with the predictors rescaled to unit variance within every window, so a
+    penalty weighs all predictors alike whatever their units.
+    """
+    scale = np.sqrt(np.diagonal(moments['gram'], axis1=1, axis2=2) / moments['n'][:, None])
+    return dict(moments, gram=moments['gram'] / scale[:, :, None] / scale[:, None, :],
+                cross=moments['cross'] / scale[:, :, None], mean_x=moments['mean_x'] / scale,
+                x_new=moments['x_new'] / scale)
+
+
+def _ridge_path(moments, alphas):
+    # Eigen-decompose each window's Gram matrix once; every penalty only rescales 1 / (d + alpha)
+    eigenvalues, eigenvectors = np.linalg.eigh(moments['gram'])
+    rotated_cross = np.einsum('mpk,mpn->mkn', eigenvectors, moments['cross'])
+    rotated_x = np.einsum('mpk,mp->mk', eigenvectors, moments['x_new'] - moments['mean_x'])
+    shrink = 1.0 / (eigenvalues[None] + alphas[:, None, None])
+    forecasts = moments['mean_y'][None] + np.einsum('amk,mk,mkn->amn', shrink, rotated_x, rotated_cross)
+    df = (eigenvalues[None] * shrink).sum(axis=2)
+    rss = moments['yy'][None] - np.einsum('amk,mkn->amn', shrink * (eigenvalues[None] + 2 * alphas[:, None, None]) * shrink,
+                                          rotated_cross ** 2)
+    return forecasts, df, rss
+
+
+def ridge_path_forecasts(X, Y, ends, alphas, window_size=None):
+    """
+    One-step-ahead Ridge forecasts for every penalty in alphas, month in ends and target
+    column of Y, as an (alphas x months x targets) array, aligned as penalized_forecasts.
+
+    The windowed Gram matrices come from window_moments and are eigen-decomposed in one
+    batched call, X'X = V diag(d) V'. The coefficients for any alpha are then V diag(1 / (d +
+    alpha)) V'X'y, so the whole penalty grid costs about as much as a single fit. Also
+    returns the effective degrees of freedom (alphas x months) and the in-window residual
+    sums of squares (alphas x months x targets) for choosing alpha.
+    """
+    return _ridge_path(window_moments(X, Y, ends, window_size), np.atleast_1d(np.asarray(alphas, dtype=float)))
+
+
+def penalty_grid(gram, cross, n, model='lasso', n_alphas=20, eps=1e-3):
+    """
+    Log-spaced penalties for a regularization path, from largest to smallest. For Lasso the
+    grid runs from alpha_max = max |X'y| / n on centred data, the smallest penalty that
+    zeroes every coefficient, down to eps * alpha_max. Ridge never zeroes a coefficient, so
+    its grid spans the eigenvalues of the centred Gram matrix from d_max / eps, where every
+    direction is shrunk almost to zero, down to eps * d_max.
+    """
+    if model == 'lasso':
+        return np.abs(cross).max() / n * np.logspace(0, np.log10(eps), n_alphas)
+    return np.linalg.eigvalsh(gram).max() * np.logspace(-np.log10(eps), np.log10(eps), n_alphas)
+
+
+def information_criterion(rss, df, n, criterion='bic'):
+    """
+    BIC (or AIC) of a Gaussian regression with residual sum of squares rss and df parameters.
+    """
+    penalty = np.log(n) if criterion == 'bic' else 2.0
+    return n * np.log(rss / n) + penalty * df
+
+
+def lasso_coordinate_descent(gram, cross, n, alphas, coefficients, tol=1e-6, max_iter=1000):
+    """
+    Minimise (1/2n)||y - Xw||^2 + alpha * |w|_1 (sklearn's Lasso objective, centred data)
+    for every alpha at once by coordinate descent on the Gram matrix. coefficients (alphas x
+    P) is the starting point and is updated in place, which is what makes warm starts free.
+    """
+    scale = np.diag(gram) / n
+    for _ in range(max_iter):
+        largest_step = 0.0
+        for j in range(len(scale)):
+            old = coefficients[:, j].copy()
+            rho = (cross[j] - coefficients @ gram[:, j]) / n + scale[j] * old
+            coefficients[:, j] = np.sign(rho) * np.maximum(np.abs(rho) - alphas, 0.0) / scale[j]
+            largest_step = max(largest_step, np.abs(coefficients[:, j] - old).max())
+        if largest_step <= tol * max(np.abs(coefficients).max(), np.finfo(float).tiny):
+            break
+    return coefficients
+
+
+def penalized_forecasts(X, y, ends, model='lasso', alphas=None, window_size=None, criterion='bic'):
+    """
+    One-step-ahead Lasso or Ridge forecasts for the rows in ends, each refitted on the rows
+    before it (or the last window_size of them), aligned as g3_1_2_3.rls_forecasts.
+
+    The predictors are standardized within each estimation window, so alphas apply to unit
+    variance predictors. The penalty grid (alphas, or penalty_grid on the first window) is
+    fixed for all months and a RuntimeWarning is raised when the selected alpha sits on the
+    edge of the grid, where the criterion may keep falling beyond it.
+    Ridge evaluates the whole grid for all months at once through the ridge path. Lasso
+    coefficients for the whole grid are carried from month to month, so every month's
+    coordinate descent starts from the previous solution. Each month the alpha with the
+    lowest information criterion on its estimation window gives the forecast. Returns the
+    forecasts and the selected alphas.
+    """
+    moments = standardized_moments(window_moments(X, y, ends, window_size))
+    n, gram, cross = moments['n'], moments['gram'], moments['cross'][..., 0]
+    if alphas is None:
+        alphas = penalty_grid(gram[0], cross[0], n[0], model)
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+
+    if model != 'lasso':
+        path, df, rss = _ridge_path(moments, alphas)
+        best = np.argmin(information_criterion(rss[..., 0], df, n[None], criterion), axis=0)
+        _warn_on_grid_edge(best == 0, best == len(alphas) - 1, len(alphas), model)
+        return path[best, np.arange(len(n)), 0], alphas[best]
+
+    coefficients = np.zeros((len(alphas), gram.shape[1]))
+    forecasts = np.empty(len(n))
+    selected = np.empty(len(n))
+    best = np.empty(len(n), dtype=int)
+    null_at_top = np.empty(len(n), dtype=bool)
+    for m in range(len(n)):
+        lasso_coordinate_descent(gram[m], cross[m], n[m], alphas, coefficients)
+        df = np.count_nonzero(coefficients, axis=1)
+        rss = moments['yy'][m, 0] - 2 * coefficients @ cross[m] + np.einsum('ap,pq,aq->a', coefficients, gram[m], coefficients)
+        best[m] = np.argmin(information_criterion(rss, df, n[m], criterion))
+        null_at_top[m] = not coefficients[0].any()
+        forecasts[m] = moments['mean_y'][m, 0] + (moments['x_new'][m] - moments['mean_x'][m]) @ coefficients[best[m]]
+        selected[m] = alphas[best[m]]
+    # The largest penalty is no edge when it already zeroes every coefficient
+    _warn_on_grid_edge((best == 0) & ~null_at_top, best == len(alphas) - 1, len(alphas), model)
+    return forecasts, selected
+
+
+def _warn_on_grid_edge(at_largest, at_smallest, n_alphas, model):
+    largest, smallest = np.count_nonzero(at_largest), np.count_nonzero(at_smallest)
+    if n_alphas > 1 and largest + smallest:
+        warnings.warn(f'{model} penalty selected on the edge of the alpha grid in {largest + smallest} of '
+                      f'{len(at_largest)} months ({largest} at the largest, {smallest} at the smallest alpha); '
+                      f'consider a wider grid', RuntimeWarning, stacklevel=3)
 
 
 class PenalizedModelVisualizer:
-    def __init__(self, data_file, in_sample_start, in_sample_end, out_sample_start, out_sample_end):
+    """
+    Lasso and Ridge forecasts refitted every month on an expanding (recursive=True) or
+    rolling (window_size) window, with alpha chosen each month along the alphas grid by
+    criterion. recursive=False with no window_size fits both models once in-sample with
+    alpha=0.1.
+    """
+    def __init__(self, data_file, in_sample_start, in_sample_end, out_sample_start, out_sample_end,
+                 recursive=True, window_size=None, alphas=None, criterion='bic'):
         self.data_file = data_file
         self.data = None
         self.models = {}
-        self.in_sample_start = in_sample_start
-        self.in_sample_end = in_sample_end
-        self.out_sample_start = out_sample_start
-        self.out_sample_end = out_sample_end  
+        self.recursive = recursive
+        self.window_size = window_size
+        self.alphas = alphas
+        self.criterion = criterion
+        self.selected_alphas = {'stocks': {}, 'bonds': {}}
+        self.in_sample_start = to_month_key(in_sample_start)
+        self.in_sample_end = to_month_key(in_sample_end)
+        self.out_sample_start = to_month_key(out_sample_start)
+        self.out_sample_end = to_month_key(out_sample_end)  
 
     def load_data(self):
         """
         Load the necessary data from the Excel file.
         """
-        self.data = pd.read_excel(self.data_file, sheet_name=None)
+        self.data = read_excel_cached(self.data_file, sheet_name=None)
+        self.data['data'] = read_merged_data(self.data_file)
         
         # Initialize an empty list to store recursive mean estimates for SP500
-        self.data['data']['Date'] = pd.to_datetime(self.data['data']['Date']) 
+        self.data['data']['Date'] = to_month_key(self.data['data']['Date']) 
         
     def fit_models(self):
         """
@@ -41,6 +215,8 @@ class PenalizedModelVisualizer:
         
         self.predictors = ['E12', 'b/m', 'tbl', 'ntis', 'infl']
         self.models = {'stocks': {'lasso': {}, 'ridge': {}}, 'bonds': {'lasso': {}, 'ridge': {}}}
+        if self.recursive or self.window_size is not None:
+            return  # refitted every month in generate_forecasts
 
         for asset_class in ['stocks', 'bonds']:        
             target = self.data['data'][f'Excess_Return_{asset_class.capitalize()}'].iloc[self.in_sample_start_index : self.in_sample_end_index+1]      
@@ -61,6 +237,8 @@ class PenalizedModelVisualizer:
         Generate forecasts using the fitted models.
         """
         forecasts = {'stocks': {}, 'bonds': {}}
+        if self.recursive or self.window_size is not None:
+            return self._recursive_forecasts(forecasts)
         
         X_test = self.data['data'][self.predictors].iloc[self.out_sample_start_index : self.out_sample_end_index+1].values
                 
@@ -71,6 +249,21 @@ class PenalizedModelVisualizer:
                 
         return forecasts
 
+    def _recursive_forecasts(self, forecasts):
+        history = self.data['data'][self.data['data']['Date'] >= self.in_sample_start].sort_values('Date', kind='stable')
+        forecast_dates = self.data['data']['Date'].iloc[self.out_sample_start_index : self.out_sample_end_index+1]
+        ends = np.searchsorted(history['Date'].to_numpy(), forecast_dates.to_numpy())
+        X = history[self.predictors].to_numpy(dtype=float)
+
+        for asset_class in ['stocks', 'bonds']:
+            y = history[f'Excess_Return_{asset_class.capitalize()}'].to_numpy(dtype=float)
+            for model_type in ['lasso', 'ridge']:
+                forecast, alphas = penalized_forecasts(X, y, ends, model_type, self.alphas, self.window_size,
+                                                       self.criterion)
+                forecasts[asset_class][model_type] = forecast
+                self.selected_alphas[asset_class][model_type] = alphas
+        return forecasts
+
     def plot_forecasts(self, forecasts,
                        sheet_prefix1='g2',
                        sheet_prefix2='g3.3'):
@@ -85,7 +278,7 @@ class PenalizedModelVisualizer:
         plt.figure(figsize=(10, 5))
                 
         #Define time for x-axis
-        time = pd.to_datetime(self.data[f'{sheet_prefix1}.Bonds_Monthly_{mu}_Forecast']['Date'])
+        time = month_key_to_timestamp(to_month_key(self.data[f'{sheet_prefix1}.Bonds_Monthly_{mu}_Forecast']['Date']))
 
         #Plot Lasso and Ridge Stocks
         for model_name, forecast in forecasts['stocks'].items():
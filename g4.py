@@ -1,48 +1,266 @@
+import json
+import os
+import shutil
+import numpy as np
 import pandas as pd
+from g0 import read_merged_data, to_month_key, month_key_to_str
+
+
+def _running_moments(returns, ends, window_size=None, start=0, fourth_moments=False):
+    """
+    Yield (n, sum of returns, sum of cross-products[, sum of |r|^2 r, sum of |r|^4]) over
+    rows [start, end), or the last window_size rows before end, for every end in ends.
+    Rows entering the window are added and rows leaving it subtracted, so each month costs
+    O(changed rows * N^2) however long the window is. Rows with any NaN are dropped listwise
+    and returns are shifted by their overall mean, which leaves every centred moment unchanged.
+    """
+    returns = np.asarray(returns, dtype=float)
+    returns = returns.reshape(len(returns), -1)
+    valid = ~np.isnan(returns).any(axis=1)
+    shift = returns[valid].mean(axis=0) if valid.any() else np.zeros(returns.shape[1])
+    returns = np.where(valid[:, None], returns - shift, 0.0)
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    norms = (returns ** 2).sum(axis=1)
+
+    n_assets = returns.shape[1]
+    total = np.zeros(n_assets)
+    cross = np.zeros((n_assets, n_assets))
+    weighted = np.zeros(n_assets)
+    quartic = 0.0
+    low = high = start
+    for end in ends:
+        begin = start if window_size is None else max(end - window_size, start)
+        if begin < low or end < high or begin >= high:
+            # The window moved backwards or jumped past the current one: start over
+            total[:], cross[:], weighted[:], quartic = 0.0, 0.0, 0.0, 0.0
+            low = high = begin
+        entering, leaving = returns[high:end], returns[low:begin]
+        total += entering.sum(axis=0) - leaving.sum(axis=0)
+        cross += entering.T @ entering - leaving.T @ leaving
+        if fourth_moments:
+            weighted += norms[high:end] @ entering - norms[low:begin] @ leaving
+            quartic += (norms[high:end] ** 2).sum() - (norms[low:begin] ** 2).sum()
+        low, high = begin, end
+        n = counts[end] - counts[begin]
+        yield (n, total, cross, weighted, quartic) if fourth_moments else (n, total, cross)
+
+
+def running_covariances(returns, ends, window_size=None, start=0, ddof=1):
+    """
+    Sample covariance matrices of rows [start, end) (or of the last window_size rows before
+    end) of a (T x N) return matrix for every end in ends, as a (months x N x N) array,
+    from running sums of returns and cross-products. Rows with any NaN are dropped listwise.
+    """
+    covariances = []
+    for n, total, cross in _running_moments(returns, ends, window_size, start):
+        mean = total / n
+        covariances.append((cross - n * np.outer(mean, mean)) / (n - ddof))
+    return np.array(covariances)
+
+
+def ledoit_wolf_covariances(returns, ends, window_size=None, start=0):
+    """
+    Ledoit-Wolf covariance matrices (shrinkage towards a scaled identity, the estimator of
+    sklearn.covariance.ledoit_wolf) over the same windows as running_covariances.
+
+    The shrinkage intensity needs sum_k |x_k|^4 of the window-demeaned returns x_k = r_k - m.
+    Expanding |r_k - m|^2 = a_k - 2 b_k + |m|^2 with a_k = |r_k|^2 and b_k = r_k . m turns it
+    into running sums of |r|^4, |r|^2 r, r r' and r, so no month revisits its window.
+    """
+    covariances = []
+    for n, total, cross, weighted, quartic in _running_moments(returns, ends, window_size, start, True):
+        mean = total / n
+        n_assets = len(mean)
+        sample = cross / n - np.outer(mean, mean)
+        mean_norm = mean @ mean
+        sum_a = np.trace(cross)
+        sum_b = mean @ total
+        sum_ab = mean @ weighted
+        sum_b2 = mean @ cross @ mean
+        fourth = (quartic + 4 * sum_b2 + n * mean_norm ** 2 - 4 * sum_ab + 2 * mean_norm * sum_a
+                  - 4 * mean_norm * sum_b)
+
+        mu = np.trace(sample) / n_assets
+        squared_norm = (sample ** 2).sum()
+        beta = min((fourth / n - squared_norm) / (n_assets * n), (squared_norm - n_assets * mu ** 2) / n_assets)
+        delta = (squared_norm - n_assets * mu ** 2) / n_assets
+        shrinkage = 0.0 if beta == 0 else beta / delta
+        covariances.append((1 - shrinkage) * sample + shrinkage * mu * np.eye(n_assets))
+    return np.array(covariances)
+
+
+def ewma_covariances(returns, ends, decay=0.94, start=0):
+    """
+    RiskMetrics exponentially weighted covariance forecasts, Sigma = decay * Sigma + (1 -
+    decay) * r r' with a zero mean, for every end in ends (using rows before end). The
+    recursion starts from the sample covariance of rows [start, ends[0]) and moves forward
+    one O(N^2) update per row. Rows with any NaN are skipped.
+    """
+    returns = np.asarray(returns, dtype=float)
+    returns = returns.reshape(len(returns), -1)
+    covariance = running_covariances(returns, ends[:1], start=start)[0]
+    covariances = np.empty((len(ends), len(covariance), len(covariance)))
+    row = ends[0]
+    for m, end in enumerate(ends):
+        for r in returns[row:end]:
+            if not np.isnan(r).any():
+                covariance *= decay
+                covariance += (1 - decay) * np.outer(r, r)
+        row = max(row, end)
+        covariances[m] = covariance
+    return covariances
+
+
+def covariance_forecasts(returns, ends, estimator='sample', window_size=None, start=0, decay=0.94):
+    """
+    Covariance matrices (months x N x N) from the 'sample', 'ledoit_wolf' or 'ewma' estimator.
+    EWMA has no estimation window, so window_size must be None for it.
+    """
+    if estimator == 'sample':
+        return running_covariances(returns, ends, window_size, start)
+    if estimator == 'ledoit_wolf':
+        return ledoit_wolf_covariances(returns, ends, window_size, start)
+    if estimator == 'ewma':
+        if window_size is not None:
+            raise ValueError('EWMA covariances do not use a rolling window')
+        return ewma_covariances(returns, ends, decay, start)
+    raise ValueError(f'Unknown covariance estimator: {estimator}')
+
+
+def covariance_frame(covariances, dates, assets):
+    """
+    Flatten a (months x N x N) covariance array into the g4 sheet layout: one row per month,
+    one 'Variance - A' or 'Covariance - A/B' column per matrix entry in row-major order.
+    The dates are indexed as '%m-%Y' strings.
+    """
+    columns = [f'Variance - {a}' if a == b else f'Covariance - {a}/{b}' for a in assets for b in assets]
+    return pd.DataFrame(np.asarray(covariances).reshape(len(covariances), -1),
+                        index=month_key_to_str(to_month_key(pd.Series(list(dates)))), columns=columns)
+
+COVARIANCE_STORE_DIR = 'cov_store'
+
+
+class PackedCovarianceStore:
+    """
+    Binary store of monthly N x N covariance matrices.
+
+    Only the upper triangle of each matrix is kept, one row of N(N+1)/2 values per month,
+    as float64 or float32, in a single memory-mapped file. The manifest holds the asset
+    names, the dtype and the month key of every row, so any month's matrix is one O(1)
+    read of its row.
+    """
+    def __init__(self, store_dir=COVARIANCE_STORE_DIR):
+        self.store_dir = store_dir
+        self._manifest = None
+        self._rows = None
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.store_dir, 'manifest.json'))
+
+    def manifest(self):
+        if self._manifest is None:
+            with open(os.path.join(self.store_dir, 'manifest.json')) as f:
+                self._manifest = json.load(f)
+            self._rows = {month: row for row, month in enumerate(self._manifest['months'])}
+        return self._manifest
+
+    def write(self, covariances, dates, assets, dtype='float64'):
+        """
+        Replace the store with a (months x N x N) covariance array and the date of each month.
+        """
+        covariances = np.asarray(covariances)
+        upper = np.triu_indices(covariances.shape[1])
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        os.makedirs(self.store_dir)
+        np.ascontiguousarray(covariances[:, upper[0], upper[1]], dtype=dtype).tofile(
+            os.path.join(self.store_dir, 'covariances.bin'))
+        manifest = {'assets': list(assets), 'dtype': np.dtype(dtype).str,
+                    'months': [int(month) for month in to_month_key(pd.Series(list(dates)))]}
+        with open(os.path.join(self.store_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        self._manifest = None
+
+    def months(self):
+        return np.array(self.manifest()['months'])
+
+    def packed(self):
+        """
+        The (months x N(N+1)/2) upper-triangle rows, memory-mapped read-only.
+        """
+        manifest = self.manifest()
+        n_assets = len(manifest['assets'])
+        return np.memmap(os.path.join(self.store_dir, 'covariances.bin'), dtype=np.dtype(manifest['dtype']),
+                         mode='r', shape=(len(manifest['months']), n_assets * (n_assets + 1) // 2))
+
+    def _unpack(self, rows):
+        n_assets = len(self.manifest()['assets'])
+        upper = np.triu_indices(n_assets)
+        matrices = np.empty(rows.shape[:-1] + (n_assets, n_assets))
+        matrices[..., upper[0], upper[1]] = rows
+        matrices[..., upper[1], upper[0]] = rows
+        return matrices
+
+    def get(self, date):
+        """
+        Covariance matrix (N x N, float64) of one month, given as a date or a month key.
+        """
+        self.manifest()
+        return self._unpack(self.packed()[self._rows[to_month_key(date)]])
+
+    def latest(self):
+        return self._unpack(self.packed()[-1])
+
+    def load(self):
+        """
+        All matrices as a (months x N x N) float64 array.
+        """
+        return self._unpack(self.packed())
+
 
 class MonthlyRecursiveVarianceCovarianceMatrixCalculator:
-    def __init__(self, file_path):
+    def __init__(self, file_path, assets=('Stocks', 'Bonds'), estimator='sample', decay=0.94):
         self.file_path = file_path
         self.data = None
+        self.assets = list(assets)
+        self.estimator = estimator
+        self.decay = decay
 
     def load_data(self):
         """
         Load necessary data from Excel file and adjust the scale of returns.
         """
-        self.data = pd.read_excel(self.file_path, sheet_name='data')
+        self.data = read_merged_data(self.file_path)
         # Adjusting the returns 
         self.data['Excess_Return_Stocks'] 
         self.data['Excess_Return_Bonds'] 
 
-    def calculate_monthly_recursive_covariance_matrix(self, initial_window=242):
+    def calculate_covariance_array(self, initial_window=242):
         """
-        Calculate the monthly recursive 2x2 variance-covariance matrix for stocks and bonds.
+        Recursive covariance forecasts of the excess returns of self.assets, (months x N x N),
+        with self.estimator, and the month key of each month from row initial_window - 1 on.
+        The matrix of month t is estimated on rows 1 to t - 1, so like the g2 / g3 mean
+        forecasts it is known before month t's returns.
         """
-        stocks_returns = self.data['Excess_Return_Stocks']
-        bonds_returns = self.data['Excess_Return_Bonds']
-        returns = pd.DataFrame({'Stocks': stocks_returns, 'Bonds': bonds_returns})
-
-        # DataFrame to store all matrices
-        all_matrices = pd.DataFrame()
-
-        # Calculate the covariance matrix for each month
-        for end_month in range(initial_window, len(returns)+1):
-            monthly_returns = returns.iloc[1:end_month]
-            cov_matrix = monthly_returns.cov()
-            matrix_flat = cov_matrix.unstack().to_frame().T
-            matrix_flat.index = [self.data['Date'].iloc[end_month-1]]
-            all_matrices = pd.concat([all_matrices, matrix_flat])
-            
-        # Renaming the columns for clarity
-        all_matrices.columns = ['Variance - Stocks', 'Covariance - Stocks/Bonds', 'Covariance - Bonds/Stocks', 'Variance - Bonds']
+        returns = self.data[[f'Excess_Return_{asset}' for asset in self.assets]].to_numpy(dtype=float)
+        ends = np.arange(initial_window-1, len(returns))
+        covariances = covariance_forecasts(returns, ends, self.estimator, start=1, decay=self.decay)
+        return covariances, to_month_key(self.data['Date'].iloc[ends])
 
-        return all_matrices
+    def calculate_monthly_recursive_covariance_matrix(self, initial_window=242):
+        """
+        Calculate the monthly recursive variance-covariance matrix of self.assets (stocks and bonds by default).
+        """
+        covariances, dates = self.calculate_covariance_array(initial_window)
+        return covariance_frame(covariances, dates, self.assets)
 
 
 def g4_demo():
     calculator = MonthlyRecursiveVarianceCovarianceMatrixCalculator('data.xlsx')
     calculator.load_data()
-    all_cov_matrices = calculator.calculate_monthly_recursive_covariance_matrix()
+    covariances, dates = calculator.calculate_covariance_array()
+    all_cov_matrices = covariance_frame(covariances, dates, calculator.assets)
+    # Packed binary copy for readers that need single months, e.g. g5_1 / g5_3 with cov_store
+    PackedCovarianceStore(os.path.join(COVARIANCE_STORE_DIR, 'g4')).write(covariances, dates, calculator.assets)
     # Save the results to the same Excel file under a new sheet
     with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
         all_cov_matrices.to_excel(writer, sheet_name='g4.all_cov_matrices')
@@ -50,47 +268,61 @@ def g4_demo():
 
 
 class MonthlyRollingWindowVarCovMatrixCalculator:
-    def __init__(self, file_path):
+    def __init__(self, file_path, assets=('Stocks', 'Bonds'), estimator='sample', decay=0.94):
         self.file_path = file_path
         self.data = None
+        self.assets = list(assets)
+        self.estimator = estimator
+        self.decay = decay
 
     def load_data(self):
         """
         Load necessary data from Excel file.
         """
-        self.data = pd.read_excel(self.file_path, sheet_name='data')
+        self.data = read_merged_data(self.file_path)
 
-    def calculate_monthly_rolling_window_covariance_matrix(self, initial_window=242):
+    def calculate_covariance_array(self, initial_window=242):
         """
-        Calculate the monthly rolling window 2x2 variance-covariance matrix for stocks and bonds.
+        Rolling covariance forecasts of the excess returns of self.assets with self.estimator,
+        (months x N x N), and the month key of each month from row initial_window - 1 on. The
+        matrix of month t is estimated on the initial_window months before t.
         """
-        stocks_returns = self.data['Excess_Return_Stocks']
-        bonds_returns = self.data['Excess_Return_Bonds']
-        returns = pd.DataFrame({'Stocks': stocks_returns, 'Bonds': bonds_returns})
-
-        # DataFrame to store all matrices
-        all_matrices = pd.DataFrame()
-
-        # Calculate the covariance matrix for each month using rolling window
-        for end_month in range(initial_window, len(returns)+1):
-            window_returns = returns.iloc[end_month-initial_window:end_month]
-            cov_matrix = window_returns.cov()
-            matrix_flat = cov_matrix.unstack().to_frame().T
-            matrix_flat.index = [self.data['Date'].iloc[end_month-1]]
-            all_matrices = pd.concat([all_matrices, matrix_flat])
+        returns = self.data[[f'Excess_Return_{asset}' for asset in self.assets]].to_numpy(dtype=float)
+        ends = np.arange(initial_window-1, len(returns))
+        covariances = covariance_forecasts(returns, ends, self.estimator, window_size=initial_window)
+        return covariances, to_month_key(self.data['Date'].iloc[ends])
 
-        # Renaming the columns for clarity
-        all_matrices.columns = ['Variance - Stocks', 'Covariance - Stocks/Bonds', 'Covariance - Bonds/Stocks', 'Variance - Bonds']
+    def calculate_monthly_rolling_window_covariance_matrix(self, initial_window=242):
+        """
+        Calculate the monthly rolling window variance-covariance matrix of self.assets (stocks and bonds by default).
+        """
+        covariances, dates = self.calculate_covariance_array(initial_window)
+        return covariance_frame(covariances, dates, self.assets)
 
-        return all_matrices
+def rolling_covariance_store(file_path='data.xlsx'):
+    """
+    Directory of the month-labelled rolling covariance store read by the g6.5 demos (the
+    g6.4 sheet has no dates). The store is computed from file_path and written first if it
+    does not exist yet, e.g. on a fresh checkout where g6_4_demo has not run.
+    """
+    store = PackedCovarianceStore(os.path.join(COVARIANCE_STORE_DIR, 'g6.4'))
+    if not store.exists():
+        calculator = MonthlyRollingWindowVarCovMatrixCalculator(file_path)
+        calculator.load_data()
+        covariances, dates = calculator.calculate_covariance_array()
+        store.write(covariances, dates, calculator.assets)
+    return store.store_dir
 
 def g6_4_demo():
     calculator = MonthlyRollingWindowVarCovMatrixCalculator('data.xlsx')
     calculator.load_data()
-    all_cov_matrices = calculator.calculate_monthly_rolling_window_covariance_matrix()
+    covariances, dates = calculator.calculate_covariance_array()
+    all_cov_matrices = covariance_frame(covariances, dates, calculator.assets)
+    # Month-labelled packed copy read by the g6.5 demos (see rolling_covariance_store)
+    PackedCovarianceStore(os.path.join(COVARIANCE_STORE_DIR, 'g6.4')).write(covariances, dates, calculator.assets)
     # # Save the results to the same Excel file under a new sheet
     # with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
-    #     all_cov_matrices.to_excel(writer, sheet_name='g6.4.all_cov_matrices', index=False)
+    #     all_cov_matrices.to_excel(writer, sheet_name='g6.4.all_cov_matrices')
     return all_cov_matrices.head()
 
 
@@ -1,42 +1,341 @@
+import os
+import warnings
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.linalg import cho_factor, cho_solve
+from g0 import read_excel_cached, to_month_key, month_key_to_str
+from g4 import PackedCovarianceStore, rolling_covariance_store
 
-class OptimalTangencyPortfolio:
+COV_COLUMNS = ['Variance - Stocks', 'Covariance - Stocks/Bonds', 'Covariance - Bonds/Stocks', 'Variance - Bonds']
+
+
+def tangency_weights(covariances, mean_forecasts, normalize=True):
+    """
+    Tangency portfolio weights, Sigma^-1 mu normalised to sum to one, for every model and
+    month at once. covariances is (T x N x N) and mean_forecasts (models x T x N), or (T x N)
+    for a single model; the result has the shape of mean_forecasts. The models are stacked
+    as right-hand sides, so each month's matrix is factorised once by one batched
+    np.linalg.solve and never inverted explicitly. normalize=False returns Sigma^-1 mu
+    itself, the mean-variance weights of an investor with unit risk aversion.
+    """
+    covariances = np.asarray(covariances, dtype=float)
+    mean_forecasts = np.asarray(mean_forecasts, dtype=float)
+    single_model = mean_forecasts.ndim == 2
+    if single_model:
+        mean_forecasts = mean_forecasts[None]
+    weights = np.moveaxis(np.linalg.solve(covariances, np.moveaxis(mean_forecasts, 0, -1)), -1, 0)
+    if normalize:
+        weights = weights / weights.sum(axis=-1, keepdims=True)
+    return weights[0] if single_model else weights
+
+
+def _project_box_l1(v, lower, upper, leverage):
+    """
+    Euclidean projection of each row of v onto {lower <= w <= upper, sum |w| <= leverage},
+    with lower <= 0 <= upper. The answer is clip(soft_threshold(v, tau)), and sum |w| is
+    piecewise linear in tau with kinks where an entry leaves its bound or reaches zero, so
+    sorting the kinks gives the exact tau for every row at once.
+    """
+    z = np.clip(v, lower, upper)
+    if leverage is None:
+        return z
+    over = np.abs(z).sum(axis=-1) > leverage
+    if not over.any():
+        return z
+    v_over = v[over]
+    magnitude = np.abs(v_over)
+    bound = np.broadcast_to(np.where(v_over >= 0, upper, -np.asarray(lower)), v_over.shape)
+    # Entry i contributes min(max(|v_i| - tau, 0), bound_i): slope -1 on [|v_i| - bound_i, |v_i|]
+    kinks = np.concatenate([np.maximum(magnitude - bound, 0), magnitude], axis=-1)
+    order = np.argsort(kinks, axis=-1)
+    kinks = np.take_along_axis(kinks, order, axis=-1)
+    slopes = np.cumsum(np.take_along_axis(np.concatenate([-np.ones_like(magnitude), np.ones_like(magnitude)], axis=-1),
+                                          order, axis=-1), axis=-1)
+    norms = np.abs(z[over]).sum(axis=-1, keepdims=True) + np.concatenate(
+        [np.zeros((len(kinks), 1)), np.cumsum(slopes[:, :-1] * np.diff(kinks, axis=-1), axis=-1)], axis=-1)
+    segment = np.argmax(norms <= leverage, axis=-1) - 1
+    rows = np.arange(len(kinks))
+    threshold = kinks[rows, segment] + (norms[rows, segment] - leverage) / -slopes[rows, segment]
+    z[over] = np.clip(np.sign(v_over) * np.maximum(magnitude - threshold[:, None], 0), lower, upper)
+    return z
+
+
+def _project_constraints(v, lower, upper, leverage, budget):
+    """
+    Euclidean projection of each row of v onto the whole constraint set. With the budget
+    constraint it is _project_box_l1(v - tau) for the shift tau at which the row sums to one;
+    that sum is non-increasing in tau, so tau is bracketed and bisected for all rows at once.
+    """
+    if not budget:
+        return _project_box_l1(v, lower, upper, leverage)
+
+    def excess(tau):
+        return _project_box_l1(v - tau[:, None], lower, upper, leverage).sum(axis=-1) - 1
+
+    step = np.abs(excess(np.zeros(len(v)))) + np.finfo(float).eps
+    low, high = -step, step.copy()
+    for _ in range(64):
+        widen_low, widen_high = excess(low) < 0, excess(high) > 0
+        if not (widen_low.any() or widen_high.any()):
+            break
+        low[widen_low] *= 2
+        high[widen_high] *= 2
+    for _ in range(64):
+        middle = (low + high) / 2
+        above = excess(middle) > 0
+        low = np.where(above, middle, low)
+        high = np.where(above, high, middle)
+    return _project_box_l1(v - high[:, None], lower, upper, leverage)
+
+
+RELAXATION = 1.6
+
+
+def _admm_schedule(covariances, mean_forecasts, settings):
+    risk_aversion, lower, upper, leverage, budget, tol, max_iter = settings
+    n_models, n_months, n_assets = mean_forecasts.shape
+    weights = np.empty_like(mean_forecasts)
+    ones = np.ones(n_assets)
+    z = _project_box_l1(np.full((n_models, n_assets), 1.0 / n_assets), lower, upper, leverage)
+    u = np.zeros_like(z)
+    unconverged = np.zeros(n_months, dtype=int)
+    rho = None
+    for t in range(n_months):
+        P = risk_aversion * covariances[t]
+        # Step size on the scale of this month's risk term; the scaled dual follows it
+        new_rho = np.trace(P) / n_assets
+        if rho is not None:
+            u *= rho / new_rho
+        rho = new_rho
+        factor = cho_factor(P + rho * np.eye(n_assets))
+        if budget:
+            budget_direction = cho_solve(factor, ones)
+        # Only problems that have not converged are iterated, so each model's iterates do not
+        # depend on which other models share the call
+        active = np.arange(n_models)
+        for _ in range(max_iter):
+            x = cho_solve(factor, (mean_forecasts[active, t] + rho * (z[active] - u[active])).T)
+            if budget:
+                x -= np.outer(budget_direction, (ones @ x - 1) / (ones @ budget_direction))
+            x = x.T
+            # Over-relaxation, as in OSQP
+            relaxed = RELAXATION * x + (1 - RELAXATION) * z[active]
+            z_previous = z[active]
+            z[active] = _project_box_l1(relaxed + u[active], lower, upper, leverage)
+            u[active] += relaxed - z[active]
+            converged = np.maximum(np.abs(x - z[active]).max(axis=-1), np.abs(z[active] - z_previous).max(axis=-1)) < tol
+            active = active[~converged]
+            if not len(active):
+                break
+        unconverged[t] = len(active)
+        weights[:, t] = z
+    return weights, unconverged
+
+
+_OPTIMIZER_STATE = {}
+
+
+def _init_optimizer_worker(covariances, settings):
+    _OPTIMIZER_STATE['covariances'] = covariances
+    _OPTIMIZER_STATE['settings'] = settings
+
+
+def _optimizer_job(mean_forecasts):
+    return _admm_schedule(_OPTIMIZER_STATE['covariances'], mean_forecasts, _OPTIMIZER_STATE['settings'])
+
+
+def constrained_weights(covariances, mean_forecasts, risk_aversion=3.0, lower=-np.inf, upper=np.inf,
+                        leverage=None, budget=True, long_only=False, tol=1e-10, max_iter=20000, n_workers=None):
+    """
+    Mean-variance weights maximising mu'w - risk_aversion / 2 * w'Sigma w for every model and
+    month, subject to lower <= w <= upper (scalars or per-asset arrays), sum |w| <= leverage,
+    sum w = 1 when budget is set, and w >= 0 when long_only. Shapes are as in tangency_weights.
+
+    Each month is a quadratic program solved by ADMM. The x-step reuses one Cholesky factor of
+    risk_aversion * Sigma + rho * I for all models and iterations. The z-step projects onto the
+    box and leverage constraints, which is the split w = w+ - w- with sum (w+ + w-) <= leverage
+    solved in closed form. Every month starts from the previous month's solution and duals,
+    which carry its active set. Models are solved together in each step, but every (model,
+    month) problem stops on its own residuals, so the result does not depend on how models
+    are split into chunks on a process pool (n_workers != 1). A RuntimeWarning reports
+    problems still above tol after max_iter iterations. The returned weights are projected
+    onto the constraint set, so they satisfy it to rounding error.
+    """
+    covariances = np.asarray(covariances, dtype=float)
+    mean_forecasts = np.asarray(mean_forecasts, dtype=float)
+    single_model = mean_forecasts.ndim == 2
+    if single_model:
+        mean_forecasts = mean_forecasts[None]
+    if long_only:
+        lower = np.maximum(lower, 0.0)
+    if leverage is not None and (np.any(np.asarray(lower) > 0) or np.any(np.asarray(upper) < 0)):
+        raise ValueError('A leverage cap needs lower <= 0 <= upper')
+    settings = (risk_aversion, lower, upper, leverage, budget, tol, max_iter)
+
+    if n_workers == 1 or len(mean_forecasts) == 1:
+        weights, unconverged = _admm_schedule(covariances, mean_forecasts, settings)
+    else:
+        n_chunks = min(len(mean_forecasts), n_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_optimizer_worker,
+                                 initargs=(covariances, settings)) as executor:
+            chunks = np.array_split(mean_forecasts, n_chunks)
+            results = list(executor.map(_optimizer_job, chunks))
+        weights = np.concatenate([chunk_weights for chunk_weights, _ in results])
+        unconverged = sum(chunk_unconverged for _, chunk_unconverged in results)
+    if unconverged.any():
+        warnings.warn(f'constrained_weights did not converge to tol={tol} within max_iter={max_iter} '
+                      f'iterations for {unconverged.sum()} (model, month) problems in {np.count_nonzero(unconverged)} '
+                      f'months', RuntimeWarning, stacklevel=2)
+    weights = _project_constraints(weights.reshape(-1, weights.shape[-1]), lower, upper, leverage,
+                                   budget).reshape(weights.shape)
+    return weights[0] if single_model else weights
+
+
+def align_covariances(covariances, covariance_months, months):
+    """
+    The covariance matrices of the given months, in that order, from a series labelled with
+    the month each matrix is used for (as g4 writes them). Months are matched by month key,
+    never by position; a month without a matrix raises ValueError.
+    """
+    positions = pd.Index(to_month_key(pd.Series(list(covariance_months)))).get_indexer(
+        to_month_key(pd.Series(list(months))))
+    if (positions < 0).any():
+        missing = to_month_key(pd.Series(list(months)))[positions < 0]
+        raise ValueError(f'No covariance matrix for {len(missing)} months, first {month_key_to_str(missing[0])}')
+    return np.asarray(covariances)[positions]
+
+
+def forecast_months(*forecast_sheets):
+    """
+    Month keys of the Date column shared by the forecast sheets; raises ValueError if the
+    sheets cover different months.
+    """
+    months = to_month_key(forecast_sheets[0]['Date'])
+    for sheet in forecast_sheets[1:]:
+        if not np.array_equal(to_month_key(sheet['Date']), months):
+            raise ValueError('The forecast sheets cover different months')
+    return months
+
+
+class CovarianceSeries:
+    """
+    Monthly covariance matrices of the portfolio calculators, read from a g4 sheet or from a
+    PackedCovarianceStore, and matched to the forecast months of self.stock_forecasts and
+    self.bond_forecasts.
+    """
+    cov_matrices = None
+    cov_store = None
+
+    def load_covariances(self, s3='g4.all_cov_matrices', cov_store=None):
+        """
+        Read the covariance matrices from sheet s3, or from the PackedCovarianceStore
+        directory cov_store when given.
+        """
+        if cov_store is not None:
+            self.cov_store = PackedCovarianceStore(cov_store)
+            if not self.cov_store.exists():
+                raise FileNotFoundError(f'No covariance store in {cov_store}; write it first with g4.g4_demo() '
+                                        f'or g4.g6_4_demo()')
+        else:
+            self.cov_matrices = read_excel_cached(self.file_path, sheet_name=s3)
+
+    def recent_cov_matrix(self):
+        """
+        The most recent covariance matrix, from the store or the last row of the sheet.
+        """
+        if self.cov_store is not None:
+            return self.cov_store.latest()
+        return self.cov_matrices.iloc[-1][COV_COLUMNS].astype(float).values.reshape(2, 2)
+
+    def cov_matrix_series(self):
+        """
+        Every monthly covariance matrix, (T x 2 x 2), from the store or the sheet.
+        """
+        if self.cov_store is not None:
+            return self.cov_store.load()
+        return self.cov_matrices[COV_COLUMNS].to_numpy(dtype=float).reshape(-1, 2, 2)
+
+    def covariance_months(self):
+        """
+        Month key of every matrix in cov_matrix_series: the month it is used for.
+        """
+        if self.cov_store is not None:
+            return self.cov_store.months()
+        if self.cov_matrices.columns[0] in COV_COLUMNS:
+            raise ValueError('The covariance sheet has no month column; write it with g4.covariance_frame '
+                             'and its index, or load a PackedCovarianceStore')
+        return to_month_key(self.cov_matrices.iloc[:, 0])
+
+    def aligned_cov_matrix_series(self):
+        """
+        The covariance matrix of every forecast month, (T x 2 x 2), matched by month key.
+        """
+        return align_covariances(self.cov_matrix_series(), self.covariance_months(),
+                                 forecast_months(self.stock_forecasts, self.bond_forecasts))
+
+
+class OptimalTangencyPortfolio(CovarianceSeries):
     def __init__(self, file_path):
         self.file_path = file_path
         self.stock_forecasts = None
         self.bond_forecasts = None
         self.cov_matrices = None
+        self.cov_store = None
 
     def load_data(self,
                   s1='g2.SP500_Monthly_Mean_Forecast',
                   s2='g2.Bonds_Monthly_Mean_Forecast',
-                  s3='g4.all_cov_matrices'):
+                  s3='g4.all_cov_matrices',
+                  cov_store=None):
+        """
+        Load necessary data from Excel file. With cov_store (a PackedCovarianceStore directory)
+        the covariance matrix is read from the store instead of sheet s3.
+        """
+        self.stock_forecasts = read_excel_cached(self.file_path, sheet_name=s1)
+        self.bond_forecasts = read_excel_cached(self.file_path, sheet_name=s2)
+        self.load_covariances(s3, cov_store)
+
+    def model_names(self):
+        """
+        None: the portfolio has the single mean forecast, so statistics frames get no Model column.
+        """
+        return None
+
+    def mean_forecast_array(self):
         """
-        Load necessary data from Excel file.
+        Mean forecasts as a (T x 2) array, stocks then bonds.
         """
-        self.stock_forecasts = pd.read_excel(self.file_path, sheet_name=s1)
-        self.bond_forecasts = pd.read_excel(self.file_path, sheet_name=s2)
-        self.cov_matrices = pd.read_excel(self.file_path, sheet_name=s3)
+        return np.column_stack([self.stock_forecasts['Mean_Forecast'].to_numpy(dtype=float),
+                                self.bond_forecasts['Mean_Forecast'].to_numpy(dtype=float)])
+
+    def calculate_weight_schedule(self):
+        """
+        Tangency weights for every month: each month's mean forecasts are paired with the
+        covariance matrix of the same month, estimated on the months before it.
+        """
+        weights = tangency_weights(self.aligned_cov_matrix_series(), self.mean_forecast_array())
+        return pd.DataFrame(weights, index=self.stock_forecasts['Date'], columns=['Stocks', 'Bonds'])
+
+    def calculate_constrained_weight_schedule(self, **constraints):
+        """
+        Like calculate_weight_schedule, with the constrained optimizer (see constrained_weights
+        for the keyword arguments, e.g. long_only=True, upper=0.8, leverage=1.5).
+        """
+        weights = constrained_weights(self.aligned_cov_matrix_series(), self.mean_forecast_array(), **constraints)
+        return pd.DataFrame(weights, index=self.stock_forecasts['Date'], columns=['Stocks', 'Bonds'])
 
     def calculate_optimal_weights(self):
         """
         Calculate the optimal tangency portfolio weights for stocks and bonds.
         """
-        # Assuming the last row of cov_matrices is the most recent covariance matrix
-        recent_cov_matrix = self.cov_matrices.iloc[-1][['Variance - Stocks', 'Covariance - Stocks/Bonds',
-                                                        'Covariance - Bonds/Stocks', 'Variance - Bonds']]
-        # Convert to numeric type
-        recent_cov_matrix = recent_cov_matrix.astype(float).values.reshape(2, 2)
+        # The covariance matrix of the last forecast month
+        recent_cov_matrix = self.aligned_cov_matrix_series()[-1]
         mean_returns = np.array([self.stock_forecasts['Mean_Forecast'].iloc[-1],
                                  self.bond_forecasts['Mean_Forecast'].iloc[-1]])
 
-        # Inverse of covariance matrix
-        inv_cov_matrix = np.linalg.inv(recent_cov_matrix)
-
         # Calculating tangency portfolio weights
-        weights = inv_cov_matrix @ mean_returns
-        weights /= np.sum(weights)
+        weights = tangency_weights(recent_cov_matrix[None], mean_returns[None])[0]
         return pd.DataFrame(weights, index=['Stocks', 'Bonds'], columns=['Weights'])
 
 def g5_1_demo():
@@ -53,8 +352,8 @@ def g6_5_1_demo():
     calculator = OptimalTangencyPortfolio('data.xlsx')
     s1 = 'g6.2.SP500_Monthly_Mu_Forecast'
     s2 = 'g6.2.Bonds_Monthly_Mu_Forecast'
-    s3 = 'g6.4.all_cov_matrices'
-    calculator.load_data(s1, s2, s3)
+    # Rolling covariances with their months, from the g6.4 store (written on first use)
+    calculator.load_data(s1, s2, cov_store=rolling_covariance_store('data.xlsx'))
     optimal_weights = calculator.calculate_optimal_weights()
     # # Saving the results to the Excel file
     # with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
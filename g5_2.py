@@ -1,5 +1,149 @@
 import pandas as pd
 import numpy as np
+from g0 import read_excel_cached, read_merged_data, to_month_key, month_key_to_str
+from g4 import rolling_covariance_store
+from g5_1 import OptimalTangencyPortfolio, tangency_weights
+
+
+def backtest_portfolios(weights, returns, periods_per_year=12):
+    """
+    Walk-forward backtest of many weight schedules at once.
+
+    weights is (models x T x N), or (T x N) for one model, where row t holds the weights
+    chosen before month t; returns is the (T x N) matrix of excess returns realised over
+    those months. Portfolio returns come from one einsum. Returns a dict with the (models x
+    T) return series and the annualised mean return, volatility and Sharpe ratio of each
+    model (NaN months are skipped).
+    """
+    weights = np.asarray(weights, dtype=float)
+    returns = np.asarray(returns, dtype=float)
+    single_model = weights.ndim == 2
+    if single_model:
+        weights = weights[None]
+    portfolio_returns = np.einsum('mtn,tn->mt', weights, returns)
+    mean_return = np.nanmean(portfolio_returns, axis=1) * periods_per_year
+    volatility = np.nanstd(portfolio_returns, axis=1, ddof=1) * np.sqrt(periods_per_year)
+    results = {'returns': portfolio_returns, 'mean_return': mean_return, 'volatility': volatility,
+               'sharpe_ratio': mean_return / volatility}
+    if single_model:
+        results = {key: value[0] for key, value in results.items()}
+    return results
+
+
+def drifted_turnover(weights, returns):
+    """
+    Trades needed each month, (models x T x N): the target weights minus last month's weights
+    after they drifted with last month's returns, w_i (1 + r_i) / (1 + w'r). The first month
+    is bought from cash. Returns are excess returns, so the drift ignores the risk-free rate.
+    """
+    weights = np.asarray(weights, dtype=float)
+    returns = np.nan_to_num(np.asarray(returns, dtype=float))
+    held = weights[:, :-1] * (1 + returns[None, :-1])
+    held /= 1 + np.einsum('mtn,tn->mt', weights[:, :-1], returns[:-1])[..., None]
+    trades = weights.copy()
+    trades[:, 1:] -= held
+    return trades
+
+
+def backtest_with_costs(weights, returns, proportional_costs=(0.0,), quadratic_costs=0.0, periods_per_year=12):
+    """
+    Net-of-cost backtest of many weight schedules under many cost assumptions in one sweep.
+
+    Shapes are as in backtest_portfolios. Cost scenario c charges proportional_costs[c] per
+    unit of turnover sum |trade| plus quadratic_costs[c] per unit of sum trade^2, with
+    trades from drifted_turnover; the two arguments broadcast against each other. Returns
+    the monthly turnover (models x T), the net returns (costs x models x T) and the net
+    annualised mean return, volatility and Sharpe ratio (costs x models).
+    """
+    weights = np.asarray(weights, dtype=float)
+    single_model = weights.ndim == 2
+    if single_model:
+        weights = weights[None]
+    proportional_costs, quadratic_costs = np.broadcast_arrays(np.atleast_1d(np.asarray(proportional_costs, dtype=float)),
+                                                              np.atleast_1d(np.asarray(quadratic_costs, dtype=float)))
+    trades = drifted_turnover(weights, returns)
+    turnover = np.abs(trades).sum(axis=-1)
+    squared_trades = (trades ** 2).sum(axis=-1)
+    gross = np.einsum('mtn,tn->mt', weights, np.asarray(returns, dtype=float))
+    net = gross[None] - proportional_costs[:, None, None] * turnover[None] - quadratic_costs[:, None, None] * squared_trades[None]
+
+    mean_return = np.nanmean(net, axis=-1) * periods_per_year
+    volatility = np.nanstd(net, axis=-1, ddof=1) * np.sqrt(periods_per_year)
+    results = {'turnover': turnover, 'net_returns': net, 'net_mean_return': mean_return,
+               'net_volatility': volatility, 'net_sharpe_ratio': mean_return / volatility,
+               'proportional_costs': proportional_costs, 'quadratic_costs': quadratic_costs}
+    if single_model:
+        results['turnover'] = turnover[0]
+        for key in ['net_returns', 'net_mean_return', 'net_volatility', 'net_sharpe_ratio']:
+            results[key] = results[key][:, 0]
+    return results
+
+
+def cost_statistics_frame(results, model_names=None):
+    """
+    One row per cost scenario (and model) from backtest_with_costs: average monthly turnover
+    and the net annualised statistics.
+    """
+    n_costs = len(results['proportional_costs'])
+    turnover = np.atleast_2d(results['turnover'])
+    names = list(model_names) if model_names is not None else [None] * len(turnover)
+    statistics = pd.DataFrame({
+        'Proportional Cost': np.repeat(results['proportional_costs'], len(names)),
+        'Quadratic Cost': np.repeat(results['quadratic_costs'], len(names)),
+        'Turnover': np.tile(np.nanmean(turnover, axis=-1), n_costs),
+        'Net Mean Return': np.reshape(results['net_mean_return'], -1),
+        'Net Volatility': np.reshape(results['net_volatility'], -1),
+        'Net Sharpe Ratio': np.reshape(results['net_sharpe_ratio'], -1)})
+    if model_names is not None:
+        statistics.insert(0, 'Model', names * n_costs)
+    return statistics
+
+
+def statistics_frame(results, model_names=None):
+    """
+    Annualised statistics from backtest_portfolios in the layout of the g5.2 / g5.4 sheets.
+    """
+    statistics = pd.DataFrame({'Mean Return': np.atleast_1d(results['mean_return']),
+                               'Volatility': np.atleast_1d(results['volatility']),
+                               'Sharpe Ratio': np.atleast_1d(results['sharpe_ratio'])})
+    if model_names is not None:
+        statistics.insert(0, 'Model', list(model_names))
+    return statistics
+
+
+def schedule_positions(dates, return_months, covariance_months=None):
+    """
+    Check the months of a weight schedule before it is backtested and return the position of
+    each in return_months. The months must be distinct and increasing and all have realised
+    returns; with covariance_months every month must also have a covariance matrix labelled
+    with it, i.e. estimated before the month as g4 writes them. Raises ValueError otherwise.
+    """
+    months = to_month_key(pd.Series(list(dates)))
+    if np.any(np.diff(months) <= 0):
+        raise ValueError('Weight schedule months must be distinct and increasing')
+    positions = pd.Index(to_month_key(pd.Series(list(return_months)))).get_indexer(months)
+    if (positions < 0).any():
+        raise ValueError(f'No realised returns for {np.count_nonzero(positions < 0)} schedule months, '
+                         f'first {month_key_to_str(months[positions < 0][0])}')
+    if covariance_months is not None:
+        missing = ~np.isin(months, to_month_key(pd.Series(list(covariance_months))))
+        if missing.any():
+            raise ValueError(f'No covariance matrix for {np.count_nonzero(missing)} schedule months, '
+                             f'first {month_key_to_str(months[missing][0])}')
+    return positions
+
+
+def realised_returns(data, dates, assets=('Stocks', 'Bonds'), covariance_months=None):
+    """
+    (T x N) excess returns from the data sheet for the given months, in that order, after
+    schedule_positions has checked the months. Raises ValueError if any return is missing.
+    """
+    positions = schedule_positions(dates, data['Date'], covariance_months)
+    returns = data[[f'Excess_Return_{asset}' for asset in assets]].to_numpy(dtype=float)[positions]
+    if np.isnan(returns).any():
+        raise ValueError('The data sheet has missing returns in the backtest months')
+    return returns
+
 
 class OptimalPortfolioStatisticsCalculator:
     def __init__(self, file_path, weights_sheet, data_sheet):
@@ -13,30 +157,65 @@ class OptimalPortfolioStatisticsCalculator:
         """
         Load necessary data from Excel file.
         """
-        self.weights = pd.read_excel(self.file_path, sheet_name=self.weights_sheet)
-        self.data = pd.read_excel(self.file_path, sheet_name=self.data_sheet)
+        self.weights = read_excel_cached(self.file_path, sheet_name=self.weights_sheet)
+        self.data = read_merged_data(self.file_path) if self.data_sheet == 'data' else \
+            read_excel_cached(self.file_path, sheet_name=self.data_sheet)
 
     def calculate_annualized_statistics(self):
         """
         Calculate mean, volatility, and Sharpe ratio for the optimal portfolio's excess return.
         """
-        # Ensure the weights are in the correct format (as a row vector)
-        portfolio_weights = self.weights['Weights'].values.reshape(1, -1)
+        # The same weights in every month of the sheet
+        returns = self.data[['Excess_Return_Stocks', 'Excess_Return_Bonds']].to_numpy(dtype=float)
+        portfolio_weights = np.broadcast_to(self.weights['Weights'].to_numpy(dtype=float), returns.shape)
+
+        # Months without returns count as a zero return, as in the original sheet statistics
+        return statistics_frame(backtest_portfolios(portfolio_weights, np.nan_to_num(returns)))
 
-        # Calculate monthly portfolio returns
-        monthly_returns = (self.data[['Excess_Return_Stocks', 'Excess_Return_Bonds']] @ portfolio_weights.T).sum(axis=1)
+    def calculate_backtest_statistics(self, weight_schedule, covariance_months=None):
+        """
+        Backtest a monthly weight schedule (a DataFrame indexed by forecast Date with Stocks
+        and Bonds columns, as from g5_1 calculate_weight_schedule): the weights of each month
+        earn that month's realised excess returns. The months are matched by key and checked
+        by schedule_positions, also against covariance_months if given. Returns the
+        statistics and the monthly portfolio returns.
+        """
+        returns = realised_returns(self.data, weight_schedule.index, covariance_months=covariance_months)
+        results = backtest_portfolios(weight_schedule[['Stocks', 'Bonds']].to_numpy(dtype=float), returns)
+        return statistics_frame(results), pd.Series(results['returns'], index=weight_schedule.index)
 
-        # Annualize the statistics
-        mean_return = monthly_returns.mean() * 12  # Assuming 12 months in a year
-        volatility = monthly_returns.std() * np.sqrt(12)  # Annualizing standard deviation
-        sharpe_ratio = mean_return / volatility  # Assuming risk-free rate is 0 or negligible
+    def calculate_cost_statistics(self, weight_schedule, proportional_costs=(0.0, 0.001, 0.005), quadratic_costs=0.0,
+                                  covariance_months=None):
+        """
+        Turnover and net-of-cost statistics of a weight schedule (as for
+        calculate_backtest_statistics) for every cost scenario, one row per scenario.
+        """
+        returns = realised_returns(self.data, weight_schedule.index, covariance_months=covariance_months)
+        results = backtest_with_costs(weight_schedule[['Stocks', 'Bonds']].to_numpy(dtype=float), returns,
+                                      proportional_costs, quadratic_costs)
+        return cost_statistics_frame(results)
 
-        return pd.DataFrame({'Mean Return': [mean_return], 'Volatility': [volatility], 'Sharpe Ratio': [sharpe_ratio]})
+def walk_forward_statistics(calculator, s1, s2, s3='g4.all_cov_matrices', cov_store=None,
+                            portfolio_class=OptimalTangencyPortfolio):
+    """
+    Out-of-sample statistics of the tangency portfolio rebalanced every month on that month's
+    forecasts (sheets s1, s2) and the covariance matrix estimated before it (sheet s3, or a
+    PackedCovarianceStore directory cov_store), earning the returns in calculator.data.
+    portfolio_class reads the forecasts: g5_1.OptimalTangencyPortfolio for the mean forecast,
+    or g5_3.AlternativeOptimalPortfolioCalculator for one row per predictive model.
+    """
+    portfolios = portfolio_class(calculator.file_path)
+    portfolios.load_data(s1, s2, s3, cov_store)
+    returns = realised_returns(calculator.data, portfolios.stock_forecasts['Date'],
+                               covariance_months=portfolios.covariance_months())
+    weights = tangency_weights(portfolios.aligned_cov_matrix_series(), portfolios.mean_forecast_array())
+    return statistics_frame(backtest_portfolios(weights, returns), portfolios.model_names())
 
 def g5_2_demo():
     calculator = OptimalPortfolioStatisticsCalculator('data.xlsx', 'g5.1.Opt_Tan_Portfolio_W', 'data')
     calculator.load_data()
-    statistics = calculator.calculate_annualized_statistics()
+    statistics = walk_forward_statistics(calculator, 'g2.SP500_Monthly_Mean_Forecast',
+                                         'g2.Bonds_Monthly_Mean_Forecast', 'g4.all_cov_matrices')
 
     # Saving the results to the Excel file
     with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
@@ -49,7 +228,8 @@ def g6_5_2_demo():
                                                       'g6.5.1.Opt_Tan_Portfolio_W',
                                                       'data')
     calculator.load_data()
-    statistics = calculator.calculate_annualized_statistics()
+    statistics = walk_forward_statistics(calculator, 'g6.2.SP500_Monthly_Mu_Forecast', 'g6.2.Bonds_Monthly_Mu_Forecast',
+                                         cov_store=rolling_covariance_store('data.xlsx'))
 
     # # Saving the results to the Excel file
     # with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
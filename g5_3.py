@@ -1,47 +1,62 @@
 import pandas as pd
 import numpy as np
+from g0 import read_excel_cached
+from g4 import rolling_covariance_store
+from g5_1 import CovarianceSeries, constrained_weights, tangency_weights
 
-class AlternativeOptimalPortfolioCalculator:
+class AlternativeOptimalPortfolioCalculator(CovarianceSeries):
     def __init__(self, file_path):
         self.file_path = file_path
         self.stock_forecasts = None
         self.bond_forecasts = None
         self.cov_matrices = None
+        self.cov_store = None
 
     def load_data(self,
                   s1='g3.3_Forecast_Excess_R_Stocks',
                   s2='g3.3_Forecast_Excess_R_Bonds',
-                  s3='g4.all_cov_matrices'):
+                  s3='g4.all_cov_matrices',
+                  cov_store=None):
         """
-        Load necessary data from Excel file.
+        Load necessary data from Excel file. With cov_store (a PackedCovarianceStore directory)
+        the covariance matrix is read from the store instead of sheet s3.
         """
-        self.stock_forecasts = pd.read_excel(self.file_path, sheet_name=s1)
-        self.bond_forecasts = pd.read_excel(self.file_path, sheet_name=s2)
-        self.cov_matrices = pd.read_excel(self.file_path, sheet_name=s3)
+        self.stock_forecasts = read_excel_cached(self.file_path, sheet_name=s1)
+        self.bond_forecasts = read_excel_cached(self.file_path, sheet_name=s2)
+        self.load_covariances(s3, cov_store)
 
-    def calculate_optimal_weights(self):
+    def model_names(self):
+        return list(self.stock_forecasts.columns[2:])  # Exclude 'Unnamed: 0' and 'Date' columns
+
+    def mean_forecast_array(self):
         """
-        Calculate optimal weights for each predictive model.
+        Mean forecasts of every model as a (models x T x 2) array, stocks then bonds.
         """
-        optimal_weights = pd.DataFrame()
+        models = self.model_names()
+        return np.stack([self.stock_forecasts[models].to_numpy(dtype=float).T,
+                         self.bond_forecasts[models].to_numpy(dtype=float).T], axis=-1)
 
-        # Use the last row of cov_matrices as the most recent covariance matrix
-        recent_cov_matrix = self.cov_matrices.iloc[-1][['Variance - Stocks', 'Covariance - Stocks/Bonds',
-                                                        'Covariance - Bonds/Stocks', 'Variance - Bonds']]
-        recent_cov_matrix = recent_cov_matrix.astype(float).values.reshape(2, 2)
-       
-        for model in self.stock_forecasts.columns[2:]:  # Exclude 'Unnamed: 0' and 'Date' columns
-            mean_returns = np.array([self.stock_forecasts[model].iloc[-1],
-                                     self.bond_forecasts[model].iloc[-1]])
-
-            # Inverse of covariance matrix
-            inv_cov_matrix = np.linalg.inv(recent_cov_matrix)
+    def calculate_weight_schedules(self):
+        """
+        Tangency weights of every model for every month, (models x T x 2), pairing each
+        forecast month with the covariance matrix of the same month.
+        """
+        return tangency_weights(self.aligned_cov_matrix_series(), self.mean_forecast_array())
 
-            # Calculating tangency portfolio weights
-            weights = inv_cov_matrix @ mean_returns
-            weights /= np.sum(weights)
-            optimal_weights[model] = weights
+    def calculate_constrained_weight_schedules(self, **constraints):
+        """
+        Constrained mean-variance weights of every model for every month, (models x T x 2);
+        see g5_1.constrained_weights for the keyword arguments.
+        """
+        return constrained_weights(self.aligned_cov_matrix_series(), self.mean_forecast_array(), **constraints)
 
+    def calculate_optimal_weights(self):
+        """
+        Calculate optimal weights for each predictive model.
+        """
+        # All models against the covariance matrix of the last forecast month in one solve
+        weights = tangency_weights(self.aligned_cov_matrix_series()[-1:], self.mean_forecast_array()[:, -1:])[:, 0]
+        optimal_weights = pd.DataFrame(weights.T, columns=self.model_names())
         optimal_weights.index = ['Stocks', 'Bonds']
         return optimal_weights
 
@@ -60,8 +75,8 @@ def g6_5_3_demo():
     calculator = AlternativeOptimalPortfolioCalculator('data.xlsx')
     s1 = 'g6.3.3_Forecast_Excess_R_Stocks'
     s2 = 'g6.3.3_Forecast_Excess_R_Bonds'
-    s3 = 'g6.4.all_cov_matrices'
-    calculator.load_data(s1, s2, s3)
+    # Rolling covariances with their months, from the g6.4 store (written on first use)
+    calculator.load_data(s1, s2, cov_store=rolling_covariance_store('data.xlsx'))
     optimal_weights = calculator.calculate_optimal_weights()
     # # Saving the results to the Excel file
     # with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
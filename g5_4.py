@@ -1,5 +1,10 @@
 import pandas as pd
 import numpy as np
+from g0 import read_excel_cached, read_merged_data
+from g4 import rolling_covariance_store
+from g5_2 import (backtest_portfolios, backtest_with_costs, cost_statistics_frame, realised_returns, statistics_frame,
+                  walk_forward_statistics)
+from g5_3 import AlternativeOptimalPortfolioCalculator
 
 class AlternativePortfolioStatisticsCalculator:
     def __init__(self, file_path, weights_sheet, data_sheet):
@@ -13,39 +18,45 @@ class AlternativePortfolioStatisticsCalculator:
         """
         Load necessary data from Excel file.
         """
-        self.weights = pd.read_excel(self.file_path, sheet_name=self.weights_sheet)
-        self.data = pd.read_excel(self.file_path, sheet_name=self.data_sheet)
+        self.weights = read_excel_cached(self.file_path, sheet_name=self.weights_sheet)
+        self.data = read_merged_data(self.file_path) if self.data_sheet == 'data' else \
+            read_excel_cached(self.file_path, sheet_name=self.data_sheet)
 
     def calculate_annualized_statistics(self):
         """
         Calculate mean, volatility, and Sharpe ratio for each set of portfolio weights.
         """
         model_names = ['Forecast_E12', 'Forecast_b/m', 'Forecast_tbl', 'Forecast_ntis', 'Forecast_infl', 'Combined_Forecast']
-        stats_results = []
+        returns = self.data[['Excess_Return_Stocks', 'Excess_Return_Bonds']].to_numpy(dtype=float)
 
-        for model in model_names:
-            # Extracting weights for Stocks and Bonds
-            stocks_weight = self.weights.loc[self.weights['Unnamed: 0'] == 'Stocks', model].iloc[0]
-            bonds_weight = self.weights.loc[self.weights['Unnamed: 0'] == 'Bonds', model].iloc[0]
-            portfolio_weights = np.array([stocks_weight, bonds_weight]).reshape(1, -1)
+        # (models x 1 x 2) static weights, held in every month of the sheet
+        weights = self.weights.set_index('Unnamed: 0').loc[['Stocks', 'Bonds'], model_names].to_numpy(dtype=float).T
+        weights = np.broadcast_to(weights[:, None, :], (len(model_names),) + returns.shape)
 
-            # Calculate monthly portfolio returns
-            monthly_returns = (self.data[['Excess_Return_Stocks', 'Excess_Return_Bonds']] @ portfolio_weights.T).sum(axis=1)
+        # Months without returns count as a zero return, as in the original sheet statistics
+        return statistics_frame(backtest_portfolios(weights, np.nan_to_num(returns)), model_names)
 
-            # Annualize the statistics
-            mean_return = monthly_returns.mean() * 12  # Assuming 12 months in a year
-            volatility = monthly_returns.std() * np.sqrt(12)  # Annualizing standard deviation
-            sharpe_ratio = mean_return / volatility  # Assuming risk-free rate is 0 or negligible
-
-            # Append the results
-            stats_results.append(pd.DataFrame({
-                'Model': [model],
-                'Mean Return': [mean_return],
-                'Volatility': [volatility],
-                'Sharpe Ratio': [sharpe_ratio]
-            }))
+    def calculate_backtest_statistics(self, weight_schedules, dates, model_names, covariance_months=None):
+        """
+        Backtest (models x T x 2) weight schedules, e.g. from g5_3 calculate_weight_schedules,
+        whose row t is held over the month dates[t]. The months are matched by key and checked
+        by g5_2.schedule_positions, also against covariance_months if given. Returns the
+        statistics of every model and the (models x T) monthly portfolio returns.
+        """
+        results = backtest_portfolios(weight_schedules, realised_returns(self.data, dates,
+                                                                         covariance_months=covariance_months))
+        return statistics_frame(results, model_names), results['returns']
 
-        return pd.concat(stats_results).reset_index(drop=True)
+    def calculate_cost_statistics(self, weight_schedules, dates, model_names,
+                                  proportional_costs=(0.0, 0.001, 0.005), quadratic_costs=0.0, covariance_months=None):
+        """
+        Turnover and net-of-cost statistics of every model's weight schedule (as for
+        calculate_backtest_statistics) under every cost scenario, one row per scenario and model.
+        """
+        results = backtest_with_costs(weight_schedules, realised_returns(self.data, dates,
+                                                                         covariance_months=covariance_months),
+                                      proportional_costs, quadratic_costs)
+        return cost_statistics_frame(results, model_names)
 
 def g5_4_demo():
     calculator = AlternativePortfolioStatisticsCalculator(
@@ -53,7 +64,8 @@ def g5_4_demo():
         'g5.3.Alt_Opt_Tan_Portfolio_W',
         'data')
     calculator.load_data()
-    statistics = calculator.calculate_annualized_statistics()
+    statistics = walk_forward_statistics(calculator, 'g3.3_Forecast_Excess_R_Stocks', 'g3.3_Forecast_Excess_R_Bonds',
+                                         portfolio_class=AlternativeOptimalPortfolioCalculator)
 
     # Saving the results to the Excel file
     with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
@@ -68,7 +80,9 @@ def g6_5_4_demo():
         'g6.5.3.Alt_Opt_Tan_Portfolio_W',
         'data')
     calculator.load_data()
-    statistics = calculator.calculate_annualized_statistics()
+    statistics = walk_forward_statistics(calculator, 'g6.3.3_Forecast_Excess_R_Stocks', 'g6.3.3_Forecast_Excess_R_Bonds',
+                                         cov_store=rolling_covariance_store('data.xlsx'),
+                                         portfolio_class=AlternativeOptimalPortfolioCalculator)
 
     # # Saving the results to the Excel file
     # with pd.ExcelWriter('data.xlsx', mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
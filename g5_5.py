@@ -1,4 +1,84 @@
+import numpy as np
 import pandas as pd
+from g0 import read_excel_cached
+from g5_1 import constrained_weights
+from g5_2 import backtest_portfolios
+
+# Relative risk aversion coefficients of the default sensitivity table
+RISK_AVERSIONS = (1, 3, 5, 10)
+
+
+def _returns_by_risk_aversion(returns, gammas, per_gamma_ndim):
+    # (gammas x models x T) from a function of gamma, a per-gamma array or one shared array
+    if callable(returns):
+        returns = np.stack([np.asarray(returns(gamma), dtype=float) for gamma in gammas])
+    returns = np.asarray(returns, dtype=float)
+    if returns.ndim < per_gamma_ndim:
+        return returns.reshape((1, -1, returns.shape[-1]))
+    if len(returns) != len(gammas):
+        raise ValueError(f'Expected returns for {len(gammas)} risk aversions, got {len(returns)}')
+    return returns.reshape((len(gammas), -1, returns.shape[-1]))
+
+
+def constrained_returns(covariances, mean_forecasts, returns, **constraints):
+    """
+    A function of gamma giving the (models x T) portfolio returns of g5_1.constrained_weights
+    re-solved at risk aversion gamma, for economic_significance. covariances and
+    mean_forecasts are aligned with the (T x N) realised returns.
+    """
+    def portfolio_returns(gamma):
+        weights = constrained_weights(covariances, mean_forecasts, risk_aversion=gamma, **constraints)
+        return np.atleast_2d(backtest_portfolios(weights, returns)['returns'])
+    return portfolio_returns
+
+
+def economic_significance(portfolio_returns, benchmark_returns, risk_aversions=RISK_AVERSIONS,
+                          scale_by_risk_aversion=False, periods_per_year=12):
+    """
+    Certainty-equivalent returns and performance fees of every model against the benchmark
+    for every risk aversion gamma, in one broadcasted pass.
+
+    portfolio_returns is (models x T) and benchmark_returns (T), monthly excess returns,
+    shared by every gamma. When the weights depend on gamma, either argument can instead be
+    a function of gamma returning that shape (e.g. constrained_returns) or an array with one
+    leading row per gamma, (gammas x models x T) or (gammas x T).
+    The CER is mean - gamma / 2 * variance. The fee is Fleming, Kirby and Ostdiek's: the
+    monthly Phi that leaves an investor with quadratic utility R - k R^2, k = gamma / (2 (1 +
+    gamma)), on gross returns R = 1 + r indifferent between the portfolio net of Phi and the
+    benchmark. That equation is quadratic in Phi and solved in closed form; it is NaN when
+    the portfolio is so much worse that no fee equates the utilities. With
+    scale_by_risk_aversion the inputs are returns of the unit-risk-aversion weights
+    Sigma^-1 mu (g5_1.tangency_weights with normalize=False): an investor with risk
+    aversion gamma holds Sigma^-1 mu / gamma, so both series are divided by gamma; this only
+    applies to shared returns. Returns annualised (gammas x models) arrays and the benchmark
+    CER (gammas).
+    """
+    per_gamma = [callable(returns) or np.ndim(returns) == ndim
+                 for returns, ndim in ((portfolio_returns, 3), (benchmark_returns, 2))]
+    if scale_by_risk_aversion and any(per_gamma):
+        raise ValueError('scale_by_risk_aversion rescales shared returns; re-solved returns are already scaled')
+    portfolio_returns = _returns_by_risk_aversion(portfolio_returns, risk_aversions, 3)
+    benchmark_returns = _returns_by_risk_aversion(benchmark_returns, risk_aversions, 2)
+    gammas = np.asarray(risk_aversions, dtype=float)[:, None]
+    if scale_by_risk_aversion:
+        portfolio_returns = portfolio_returns / gammas[..., None]
+        benchmark_returns = benchmark_returns / gammas[..., None]
+
+    # (gammas x models) for the portfolios, (gammas x 1) for the benchmark
+    cer, benchmark_cer = [(np.nanmean(r, axis=-1) - gammas / 2 * np.nanvar(r, axis=-1, ddof=1)) * periods_per_year
+                          for r in (portfolio_returns, benchmark_returns)]
+
+    k = gammas / (2 * (1 + gammas))
+    mean, second_moment = np.nanmean(1 + portfolio_returns, axis=-1), np.nanmean((1 + portfolio_returns) ** 2, axis=-1)
+    benchmark_utility = np.nanmean(1 + benchmark_returns, axis=-1) - k * np.nanmean((1 + benchmark_returns) ** 2, axis=-1)
+    # k Phi^2 + (1 - 2 k m) Phi - (m - k s - U_b) = 0, taking the root that vanishes with the utility gap
+    linear = 1 - 2 * k * mean
+    gap = mean - k * second_moment - benchmark_utility
+    with np.errstate(invalid='ignore'):
+        fee = 2 * gap / (linear + np.sqrt(linear ** 2 + 4 * k * gap))
+    return {'cer': cer, 'benchmark_cer': benchmark_cer[:, 0], 'cer_gain': cer - benchmark_cer,
+            'performance_fee': fee * periods_per_year}
+
 
 class ComparativeAnalysis:
     def __init__(self, file_path, benchmark_sheet, alternative_sheet):
@@ -10,8 +90,8 @@ class ComparativeAnalysis:
 
     def load_data(self):
         """ Load the benchmark and alternative portfolio statistics from the Excel file. """
-        self.benchmark_data = pd.read_excel(self.file_path, sheet_name=self.benchmark_sheet)
-        self.alternative_data = pd.read_excel(self.file_path, sheet_name=self.alternative_sheet)
+        self.benchmark_data = read_excel_cached(self.file_path, sheet_name=self.benchmark_sheet)
+        self.alternative_data = read_excel_cached(self.file_path, sheet_name=self.alternative_sheet)
 
     def perform_comparative_analysis(self):
         """ Compare the summary statistics of the optimal portfolio based on the mean benchmark
@@ -28,6 +108,21 @@ class ComparativeAnalysis:
         comparison.drop('Unnamed: 0', axis=1, inplace=True)
         return comparison
 
+    def perform_economic_analysis(self, model_returns, benchmark_returns, model_names,
+                                  risk_aversions=RISK_AVERSIONS, scale_by_risk_aversion=False):
+        """ CER, CER gain and performance fee of every model relative to the benchmark
+        portfolio for every risk aversion, from monthly portfolio returns (models x T and T,
+        e.g. from the g5_2 / g5_4 backtests, or re-solved per risk aversion as accepted by
+        economic_significance). One row per risk aversion and model. """
+        results = economic_significance(model_returns, benchmark_returns, risk_aversions, scale_by_risk_aversion)
+        n_models = len(model_names)
+        return pd.DataFrame({'Risk Aversion': np.repeat(np.asarray(risk_aversions, dtype=float), n_models),
+                             'Model': list(model_names) * len(results['cer']),
+                             'CER': results['cer'].ravel(),
+                             'Benchmark CER': np.repeat(results['benchmark_cer'], n_models),
+                             'CER Gain': results['cer_gain'].ravel(),
+                             'Performance Fee': results['performance_fee'].ravel()})
+
 
 def g5_5_demo():
     analyst = ComparativeAnalysis('data.xlsx',
@@ -1,6 +1,6 @@
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
+from g0 import read_excel_cached, read_merged_data, to_month_key, month_key_to_timestamp
 
 class PortfolioVisualizer:
     def __init__(self, file_path):
@@ -10,12 +10,12 @@ class PortfolioVisualizer:
                              s1='g5.1.Opt_Tan_Portfolio_W',
                              s2='g5.3.Alt_Opt_Tan_Portfolio_W'):
         # Load data
-        returns_data = pd.read_excel(self.file_path, sheet_name='data')
-        tan_weights_data = pd.read_excel(self.file_path, sheet_name=s1, index_col=0)
-        alt_weights_data = pd.read_excel(self.file_path, sheet_name=s2, index_col=0)
+        returns_data = read_merged_data(self.file_path)
+        tan_weights_data = read_excel_cached(self.file_path, sheet_name=s1, index_col=0)
+        alt_weights_data = read_excel_cached(self.file_path, sheet_name=s2, index_col=0)
 
         # Convert 'Date' column to datetime for better x-axis formatting
-        returns_data['Date'] = pd.to_datetime(returns_data['Date'], format='%m-%Y')
+        returns_data['Date'] = month_key_to_timestamp(to_month_key(returns_data['Date']))
 
         # Calculate cumulative returns
         returns_data['Cumulative Return Stocks'] = returns_data['Excess_Return_Stocks'].cumsum()
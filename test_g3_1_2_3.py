@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import statsmodels.api as sm
+from scipy import stats
+
+from g3_1_2_3 import RecursiveLeastSquares, combination_forecasts, rls_forecasts, subset_regression_forecasts
+
+
+def ols_reference(x, y, ends, window_size=None):
+    """One statsmodels OLS fit per forecast month."""
+    forecasts = []
+    for end in ends:
+        begin = 0 if window_size is None else max(end - window_size, 0)
+        params = sm.OLS(y[begin:end], sm.add_constant(x[begin:end], has_constant='add')).fit().params
+        forecasts.append(params[0] + params[1] * x[end])
+    return np.array(forecasts)
+
+
+@pytest.fixture
+def persistent_predictor():
+    rng = np.random.default_rng(0)
+    x = 50 + rng.standard_normal(600).cumsum()
+    y = 0.01 * x + rng.standard_normal(600)
+    return x, y
+
+
+@pytest.mark.parametrize('window_size', [None, 12, 60])
+def test_rls_forecasts_match_statsmodels(persistent_predictor, window_size):
+    x, y = persistent_predictor
+    ends = np.arange(60, len(x))
+    np.testing.assert_allclose(rls_forecasts(x, y, ends, window_size), ols_reference(x, y, ends, window_size),
+                               rtol=0, atol=1e-11)
+
+
+def test_rls_forecasts_skip_months(persistent_predictor):
+    x, y = persistent_predictor
+    ends = np.arange(60, len(x), 7)
+    np.testing.assert_allclose(rls_forecasts(x, y, ends, 24), ols_reference(x, y, ends, 24), rtol=0, atol=1e-11)
+
+
+def test_recursive_least_squares_add_and_remove():
+    rng = np.random.default_rng(1)
+    X = np.column_stack([np.ones(40), rng.standard_normal((40, 2))])
+    y = rng.standard_normal(40)
+    rls = RecursiveLeastSquares(X[:20], y[:20])
+    for row in range(20, 40):
+        rls.add(X[row], y[row])
+    for row in range(10):
+        rls.remove(X[row], y[row])
+    np.testing.assert_allclose(rls.beta, np.linalg.lstsq(X[10:], y[10:], rcond=None)[0], rtol=1e-10)
+    np.testing.assert_allclose(rls.P, np.linalg.inv(X[10:].T @ X[10:]), rtol=1e-9)
+
+
+@pytest.mark.parametrize('window_size', [None, 40])
+def test_subset_regression_forecasts_match_statsmodels(window_size):
+    rng = np.random.default_rng(2)
+    X = rng.standard_normal((150, 4)) + np.array([0.0, 5.0, -3.0, 100.0])
+    Y = X @ rng.standard_normal((4, 2)) * 0.1 + rng.standard_normal((150, 2))
+    ends = np.arange(60, 150, 5)
+    forecasts, subsets = subset_regression_forecasts(X, Y, ends, window_size)
+
+    assert len(subsets) == 2 ** X.shape[1] - 1
+    for s, subset in enumerate(subsets):
+        for m, end in enumerate(ends):
+            begin = 0 if window_size is None else max(end - window_size, 0)
+            exog = sm.add_constant(X[begin:end, list(subset)], has_constant='add')
+            for n in range(Y.shape[1]):
+                params = sm.OLS(Y[begin:end, n], exog).fit().params
+                expected = params[0] + X[end, list(subset)] @ params[1:]
+                assert np.isclose(forecasts[s, n, m], expected, rtol=0, atol=1e-10)
+
+
+@pytest.mark.parametrize('theta', [1.0, 0.9])
+def test_combination_forecasts_match_direct_weights(theta):
+    rng = np.random.default_rng(3)
+    n_months, n_models, n_assets, holdout = 80, 5, 2, 12
+    actuals = rng.standard_normal((n_months, n_assets))
+    forecasts = actuals[:, None, :] * 0.3 + rng.standard_normal((n_months, n_models, n_assets)) * \
+        np.linspace(0.5, 2.0, n_models)[None, :, None]
+    combined = combination_forecasts(forecasts, actuals, theta=theta, holdout=holdout, trim=1)
+
+    squared_errors = (actuals[:, None, :] - forecasts) ** 2
+    for t in range(n_months):
+        if t < holdout:
+            weights = np.ones((n_models, n_assets))
+        else:
+            discount = theta ** (t - 1 - np.arange(t))
+            weights = 1.0 / np.einsum('s,smn->mn', discount, squared_errors[:t])
+        expected = (weights * forecasts[t]).sum(axis=0) / weights.sum(axis=0)
+        np.testing.assert_allclose(combined['DMSPE'][t], expected, rtol=1e-12)
+    np.testing.assert_allclose(combined['Trimmed'], stats.trim_mean(forecasts, 1 / n_models, axis=1), rtol=1e-12)
+    np.testing.assert_allclose(combined['Median'], np.median(forecasts, axis=1), rtol=0)
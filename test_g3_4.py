@@ -0,0 +1,31 @@
+import numpy as np
+
+from g3_4 import forecast_accuracy
+
+
+def test_forecast_accuracy_matches_direct_computation():
+    rng = np.random.default_rng(0)
+    n_models, n_assets, T = 4, 2, 120
+    actuals = rng.standard_normal((n_assets, T))
+    benchmark = rng.standard_normal((n_assets, T)) * 0.1
+    forecasts = actuals[None] * 0.2 + rng.standard_normal((n_models, n_assets, T)) * 0.5
+    # Models and the benchmark miss different months
+    forecasts[0, :, :10] = np.nan
+    forecasts[2, 1, 50:55] = np.nan
+    benchmark[0, -3:] = np.nan
+    results = forecast_accuracy(forecasts, actuals, benchmark)
+
+    for m in range(n_models):
+        for a in range(n_assets):
+            shared = ~np.isnan(forecasts[m, a]) & ~np.isnan(benchmark[a])
+            model_errors = (actuals[a, shared] - forecasts[m, a, shared]) ** 2
+            benchmark_errors = (actuals[a, shared] - benchmark[a, shared]) ** 2
+            assert np.isclose(results['msfe'][m, a], model_errors.mean(), rtol=1e-14)
+            assert np.isclose(results['paired_benchmark_msfe'][m, a], benchmark_errors.mean(), rtol=1e-14)
+            assert np.isclose(results['r2_os'][m, a], 1 - model_errors.sum() / benchmark_errors.sum(), rtol=1e-12)
+            difference = np.zeros(T)
+            difference[shared] = benchmark_errors - model_errors
+            np.testing.assert_allclose(results['cumulative_sse_difference'][m, a], np.cumsum(difference),
+                                       rtol=1e-12, atol=1e-14)
+    expected_benchmark = [np.nanmean((actuals[a] - benchmark[a]) ** 2) for a in range(n_assets)]
+    np.testing.assert_allclose(results['benchmark_msfe'], expected_benchmark, rtol=1e-14)
@@ -0,0 +1,98 @@
+import numpy as np
+import statsmodels.api as sm
+from scipy import stats
+from statsmodels.stats.sandwich_covariance import cov_hac
+
+from g3_5 import (DmTestCalculator, forecast_comparison_tests, newey_west_variance, stationary_bootstrap_counts,
+                  superior_predictive_ability)
+
+
+def hac_variance(series, lag):
+    """Newey-West variance of the mean of series, from statsmodels."""
+    results = sm.OLS(series, np.ones(len(series))).fit()
+    return cov_hac(results, nlags=lag, use_correction=False)[0, 0]
+
+
+def test_newey_west_variance_matches_statsmodels():
+    rng = np.random.default_rng(0)
+    d = rng.standard_normal((300, 4)).cumsum(axis=0) * 0.1 + rng.standard_normal((300, 4))
+    for lag in [0, 1, 4, 12]:
+        expected = [hac_variance(d[:, j], lag) * len(d) for j in range(d.shape[1])]
+        np.testing.assert_allclose(newey_west_variance(d, lag), expected, rtol=1e-12)
+
+
+def test_newey_west_variance_fft_matches_direct():
+    d = np.random.default_rng(1).standard_normal((250, 3))
+    np.testing.assert_allclose(newey_west_variance(d, 40, fft=True), newey_west_variance(d, 40, fft=False),
+                               rtol=1e-10)
+
+
+def test_newey_west_se_keeps_original_scaling():
+    d = np.random.default_rng(2).standard_normal(200)
+    T, lag = len(d), 4
+    covariances = [np.sum((d[:T - k] - d.mean()) * (d[k:] - d.mean())) / T for k in range(lag + 1)]
+    weights = 1 - np.arange(lag + 1) / (lag + 1)
+    expected = np.sqrt(2 * np.dot(weights, covariances) / T)
+    assert np.isclose(DmTestCalculator('', '2000-01-01', '2000-01-01').newey_west_se(d, lag), expected, rtol=1e-12)
+
+
+def test_forecast_comparison_tests_match_direct_hac():
+    rng = np.random.default_rng(3)
+    T, n_models, n_assets, lag = 240, 3, 2, 4
+    actuals = rng.standard_normal((n_assets, T))
+    benchmark = rng.standard_normal((n_assets, T)) * 0.1
+    forecasts = actuals[None] * 0.2 + rng.standard_normal((n_models, n_assets, T)) * 0.3
+    results = forecast_comparison_tests(actuals, forecasts, benchmark, lag)
+
+    for m in range(n_models):
+        for a in range(n_assets):
+            e_model = actuals[a] - forecasts[m, a]
+            e_benchmark = actuals[a] - benchmark[a]
+            dm_loss = e_model ** 2 - e_benchmark ** 2
+            cw_loss = e_benchmark ** 2 - (e_model ** 2 - (benchmark[a] - forecasts[m, a]) ** 2)
+            dm_stat = dm_loss.mean() / np.sqrt(hac_variance(dm_loss, lag))
+            cw_stat = cw_loss.mean() / np.sqrt(hac_variance(cw_loss, lag))
+            assert np.isclose(results['dm_stat'][m, a], dm_stat, rtol=1e-10)
+            assert np.isclose(results['dm_p_value'][m, a], stats.norm.cdf(-abs(dm_stat)), rtol=1e-10)
+            assert np.isclose(results['cw_stat'][m, a], cw_stat, rtol=1e-10)
+            assert np.isclose(results['cw_p_value'][m, a], stats.norm.sf(cw_stat), rtol=1e-10)
+
+
+def test_stationary_bootstrap_counts_match_index_resampling():
+    T, n_boot, block_length = 50, 20, 5
+    counts = stationary_bootstrap_counts(T, n_boot, block_length, np.random.default_rng(4))
+
+    rng = np.random.default_rng(4)
+    new_block = rng.random((n_boot, T)) < 1.0 / block_length
+    starts = rng.integers(0, T, size=(n_boot, T))
+    for b in range(n_boot):
+        indices = []
+        for t in range(T):
+            if t == 0 or new_block[b, t]:
+                index = starts[b, t]
+            else:
+                index = (indices[-1] + 1) % T
+            indices.append(index)
+        np.testing.assert_array_equal(counts[b], np.bincount(indices, minlength=T))
+
+
+def test_superior_predictive_ability_is_independent_of_workers():
+    rng = np.random.default_rng(5)
+    benchmark_losses = rng.standard_normal(200) ** 2
+    model_losses = rng.standard_normal((200, 3)) ** 2
+    serial = superior_predictive_ability(benchmark_losses, model_losses, n_boot=300, seed=7, n_workers=1,
+                                         batch_size=100)
+    parallel = superior_predictive_ability(benchmark_losses, model_losses, n_boot=300, seed=7, n_workers=2,
+                                           batch_size=100)
+    assert serial == parallel
+
+
+def test_superior_predictive_ability_detects_better_model():
+    rng = np.random.default_rng(6)
+    errors = rng.standard_normal((300, 2))
+    benchmark_losses = (errors[:, 0] + 1.0) ** 2
+    model_losses = np.column_stack([errors[:, 0] ** 2, (errors[:, 0] + 1.2) ** 2])
+    results = superior_predictive_ability(benchmark_losses, model_losses, n_boot=500, n_workers=1)
+    assert results['rc_p_value'] < 0.01
+    assert results['spa_p_value_consistent'] < 0.01
+    assert results['spa_p_value_lower'] <= results['spa_p_value_consistent'] <= results['spa_p_value_upper']
@@ -0,0 +1,73 @@
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Lasso, Ridge
+
+from g3_6 import lasso_coordinate_descent, penalized_forecasts, ridge_path_forecasts
+
+
+@pytest.fixture
+def regression_data():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 4)) * np.array([1.0, 10.0, 0.1, 3.0]) + np.array([0.0, 50.0, -2.0, 5.0])
+    Y = X @ np.array([[0.3, 0.0], [0.01, 0.02], [2.0, -1.0], [0.0, 0.1]]) + rng.standard_normal((200, 2))
+    return X, Y
+
+
+def standardized_window(X, begin, end):
+    window = X[begin:end]
+    return window.mean(axis=0), window.std(axis=0)
+
+
+@pytest.mark.parametrize('window_size', [None, 60])
+def test_ridge_path_forecasts_match_sklearn(regression_data, window_size):
+    X, Y = regression_data
+    ends = np.arange(80, 200, 10)
+    alphas = [0.01, 1.0, 100.0]
+    forecasts, _, rss = ridge_path_forecasts(X, Y, ends, alphas, window_size)
+
+    for a, alpha in enumerate(alphas):
+        for m, end in enumerate(ends):
+            begin = 0 if window_size is None else max(end - window_size, 0)
+            model = Ridge(alpha=alpha, solver='cholesky').fit(X[begin:end], Y[begin:end])
+            np.testing.assert_allclose(forecasts[a, m], model.predict(X[end:end + 1])[0], rtol=0, atol=1e-11)
+            residuals = Y[begin:end] - model.predict(X[begin:end])
+            np.testing.assert_allclose(rss[a, m], (residuals ** 2).sum(axis=0), rtol=1e-9)
+
+
+def test_lasso_coordinate_descent_matches_sklearn(regression_data):
+    X, Y = regression_data
+    centered_x, centered_y = X - X.mean(axis=0), Y[:, 0] - Y[:, 0].mean()
+    alphas = np.array([1.0, 0.1, 0.01])
+    coefficients = lasso_coordinate_descent(centered_x.T @ centered_x, centered_x.T @ centered_y, len(X), alphas,
+                                            np.zeros((len(alphas), X.shape[1])), tol=1e-12, max_iter=100000)
+    for a, alpha in enumerate(alphas):
+        expected = Lasso(alpha=alpha, tol=1e-14, max_iter=100000).fit(X, Y[:, 0]).coef_
+        np.testing.assert_allclose(coefficients[a], expected, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('model', ['lasso', 'ridge'])
+def test_penalized_forecasts_standardize_each_window(regression_data, model):
+    X, Y = regression_data
+    y = Y[:, 0]
+    ends = np.arange(80, 200, 10)
+    alpha = 0.05 if model == 'lasso' else 5.0
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        forecasts, selected = penalized_forecasts(X, y, ends, model, alphas=[alpha], window_size=60)
+
+    np.testing.assert_array_equal(selected, alpha)
+    for m, end in enumerate(ends):
+        begin = max(end - 60, 0)
+        mean, scale = standardized_window(X, begin, end)
+        estimator = Lasso(alpha=alpha, tol=1e-14, max_iter=100000) if model == 'lasso' else Ridge(alpha=alpha)
+        estimator.fit((X[begin:end] - mean) / scale, y[begin:end])
+        expected = estimator.predict(((X[end] - mean) / scale)[None])[0]
+        assert np.isclose(forecasts[m], expected, rtol=0, atol=1e-7 if model == 'lasso' else 1e-11)
+
+
+def test_penalized_forecasts_warn_on_grid_edge(regression_data):
+    X, Y = regression_data
+    with pytest.warns(RuntimeWarning, match='edge of the alpha grid'):
+        penalized_forecasts(X, Y[:, 0], np.arange(80, 200, 10), 'ridge', alphas=[1e6, 1e7])
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.covariance import ledoit_wolf
+
+from g0 import to_month_key
+from g4 import (PackedCovarianceStore, covariance_forecasts, ewma_covariances, ledoit_wolf_covariances,
+                running_covariances)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal((150, 3)) @ np.array([[1.0, 0.3, 0.0], [0.0, 0.5, 0.2], [0.0, 0.0, 2.0]]) + 5.0
+    values[[20, 77], 1] = np.nan
+    return values
+
+
+def complete_rows(returns, begin, end):
+    window = returns[begin:end]
+    return window[~np.isnan(window).any(axis=1)]
+
+
+@pytest.mark.parametrize('window_size', [None, 30])
+def test_running_covariances_match_numpy(returns, window_size):
+    ends = np.array(list(range(40, 150, 3)) + [60, 149])  # including windows that move backwards
+    covariances = running_covariances(returns, ends, window_size, start=1)
+    for m, end in enumerate(ends):
+        begin = 1 if window_size is None else max(end - window_size, 1)
+        np.testing.assert_allclose(covariances[m], np.cov(complete_rows(returns, begin, end), rowvar=False),
+                                   rtol=1e-12)
+
+
+@pytest.mark.parametrize('window_size', [None, 30])
+def test_ledoit_wolf_covariances_match_sklearn(returns, window_size):
+    ends = np.arange(40, 150, 7)
+    covariances = ledoit_wolf_covariances(returns, ends, window_size)
+    for m, end in enumerate(ends):
+        begin = 0 if window_size is None else max(end - window_size, 0)
+        expected, _ = ledoit_wolf(complete_rows(returns, begin, end))
+        np.testing.assert_allclose(covariances[m], expected, rtol=1e-10)
+
+
+def test_ewma_covariances_match_recursion(returns):
+    ends = np.arange(40, 150, 5)
+    decay = 0.9
+    covariances = ewma_covariances(returns, ends, decay)
+
+    expected = np.cov(complete_rows(returns, 0, ends[0]), rowvar=False)
+    row = ends[0]
+    for m, end in enumerate(ends):
+        for r in complete_rows(returns, row, end):
+            expected = decay * expected + (1 - decay) * np.outer(r, r)
+        row = end
+        np.testing.assert_allclose(covariances[m], expected, rtol=1e-12)
+
+
+def test_covariance_forecasts_reject_windowed_ewma(returns):
+    with pytest.raises(ValueError):
+        covariance_forecasts(returns, np.arange(40, 50), 'ewma', window_size=30)
+
+
+@pytest.mark.parametrize('dtype, rtol', [('float64', 0), ('float32', 1e-6)])
+def test_packed_covariance_store_round_trip(tmp_path, returns, dtype, rtol):
+    covariances = running_covariances(returns, np.arange(40, 150), 30)
+    dates = pd.date_range('2000-01-01', periods=len(covariances), freq='MS')
+    store = PackedCovarianceStore(str(tmp_path / 'store'))
+    store.write(covariances, dates, ['A', 'B', 'C'], dtype=dtype)
+
+    reopened = PackedCovarianceStore(str(tmp_path / 'store'))
+    assert reopened.exists()
+    np.testing.assert_array_equal(reopened.months(), to_month_key(pd.Series(dates)))
+    np.testing.assert_allclose(reopened.load(), covariances, rtol=rtol)
+    np.testing.assert_allclose(reopened.latest(), covariances[-1], rtol=rtol)
+    np.testing.assert_allclose(reopened.get('2003-07-01'), covariances[42], rtol=rtol)
+    assert reopened.packed().shape == (len(covariances), 6)
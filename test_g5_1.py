@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+from g5_1 import constrained_weights, tangency_weights
+
+
+@pytest.fixture
+def problems():
+    rng = np.random.default_rng(0)
+    n_months, n_models, n_assets = 6, 3, 3
+    factors = rng.standard_normal((n_months, n_assets, n_assets)) * 0.05
+    covariances = factors @ np.swapaxes(factors, 1, 2) + 0.001 * np.eye(n_assets)
+    mean_forecasts = rng.standard_normal((n_models, n_months, n_assets)) * 0.01
+    return covariances, mean_forecasts
+
+
+def slsqp_weights(covariance, mu, risk_aversion, lower, upper, leverage):
+    """Reference solution of the same problem, with |w| split into w+ - w- for the leverage cap."""
+    n_assets = len(mu)
+
+    def objective(v):
+        w = v[:n_assets] - v[n_assets:]
+        return -(mu @ w - risk_aversion / 2 * w @ covariance @ w)
+
+    constraints = [{'type': 'eq', 'fun': lambda v: (v[:n_assets] - v[n_assets:]).sum() - 1}]
+    if leverage is not None:
+        constraints.append({'type': 'ineq', 'fun': lambda v: leverage - v.sum()})
+    constraints.append({'type': 'ineq', 'fun': lambda v: (v[:n_assets] - v[n_assets:]) - lower})
+    constraints.append({'type': 'ineq', 'fun': lambda v: upper - (v[:n_assets] - v[n_assets:])})
+    start = np.concatenate([np.full(n_assets, 1.0 / n_assets), np.zeros(n_assets)])
+    result = minimize(objective, start, method='SLSQP', bounds=[(0, None)] * (2 * n_assets),
+                      constraints=constraints, options={'ftol': 1e-15, 'maxiter': 1000})
+    return result.x[:n_assets] - result.x[n_assets:], -result.fun
+
+
+@pytest.mark.parametrize('lower, upper, leverage', [(-0.5, 0.8, None), (0.0, 1.0, None), (-1.0, 1.5, 1.6)])
+def test_constrained_weights_match_slsqp(problems, lower, upper, leverage):
+    covariances, mean_forecasts = problems
+    risk_aversion = 5.0
+    weights = constrained_weights(covariances, mean_forecasts, risk_aversion, lower, upper, leverage, n_workers=1)
+
+    for m in range(mean_forecasts.shape[0]):
+        for t in range(mean_forecasts.shape[1]):
+            w = weights[m, t]
+            assert np.isclose(w.sum(), 1, rtol=0, atol=1e-12)
+            assert np.all(w >= lower - 1e-12) and np.all(w <= upper + 1e-12)
+            if leverage is not None:
+                assert np.abs(w).sum() <= leverage + 1e-12
+            expected, best = slsqp_weights(covariances[t], mean_forecasts[m, t], risk_aversion, lower, upper, leverage)
+            utility = mean_forecasts[m, t] @ w - risk_aversion / 2 * w @ covariances[t] @ w
+            assert utility >= best - 1e-12
+            np.testing.assert_allclose(w, expected, rtol=0, atol=1e-7)
+
+
+def test_constrained_weights_with_budget_only_match_closed_form(problems):
+    covariances, mean_forecasts = problems
+    # Only the budget: the solution is the minimum-variance portfolio plus a multiple of Sigma^-1 mu
+    weights = constrained_weights(covariances, mean_forecasts, risk_aversion=2.0, n_workers=1)
+    inverse_mu = np.linalg.solve(covariances[None], mean_forecasts[..., None])[..., 0]
+    inverse_ones = np.linalg.solve(covariances, np.ones(covariances.shape[:2])[..., None])[..., 0]
+    shift = (1 - inverse_mu.sum(axis=-1) / 2.0) / inverse_ones.sum(axis=-1)
+    expected = inverse_mu / 2.0 + shift[..., None] * inverse_ones[None]
+    np.testing.assert_allclose(weights, expected, rtol=0, atol=1e-9)
+
+
+def test_constrained_weights_are_independent_of_workers(problems):
+    covariances, mean_forecasts = problems
+    serial = constrained_weights(covariances, mean_forecasts, lower=0.0, upper=0.7, n_workers=1)
+    parallel = constrained_weights(covariances, mean_forecasts, lower=0.0, upper=0.7, n_workers=2)
+    np.testing.assert_allclose(serial, parallel, rtol=0, atol=1e-14)
+
+
+def test_tangency_weights_match_explicit_inverse(problems):
+    covariances, mean_forecasts = problems
+    weights = tangency_weights(covariances, mean_forecasts)
+    for m in range(mean_forecasts.shape[0]):
+        for t in range(mean_forecasts.shape[1]):
+            raw = np.linalg.inv(covariances[t]) @ mean_forecasts[m, t]
+            np.testing.assert_allclose(weights[m, t], raw / raw.sum(), rtol=1e-10)